@@ -1,38 +1,722 @@
-from flask import Flask, render_template, request, jsonify
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+import asyncio
+import difflib
+import hashlib
+import json
 import openai
 import os
-import tempfile
+import queue
+import random
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import uuid
 
 app = Flask(__name__)
 openai_api_key = os.getenv('OPENAI_API_KEY')
 if not openai_api_key:
     raise ValueError("OPENAI_API_KEY environment variable not set")
+# Upstream calls share one AsyncOpenAI client (and its HTTP connection pool)
+# per process. At most UPSTREAM_CONCURRENCY calls are in flight and at most
+# UPSTREAM_QUEUE_LIMIT more may wait; anything beyond that is refused at once.
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+OPENAI_BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "0.5"))
+OPENAI_BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "8"))
+UPSTREAM_CONCURRENCY = int(os.getenv("UPSTREAM_CONCURRENCY", "16"))
+UPSTREAM_QUEUE_LIMIT = int(os.getenv("UPSTREAM_QUEUE_LIMIT", "32"))
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "10"))
 
-    
-client = openai.OpenAI(api_key=openai_api_key)
+# Streaming ingest: the browser records in self-contained segments of
+# SEGMENT_SECONDS and posts each one while recording continues. Segments are
+# transcribed concurrently on a bounded pool and stitched back in order.
+# Upload sessions live in process memory, so the page only uses them when
+# SEGMENTED_UPLOADS is enabled on a single long-running server process;
+# otherwise it posts the whole recording to /upload.
+SEGMENTED_UPLOADS = os.getenv("SEGMENTED_UPLOADS", "0").lower() in ("1", "true", "yes")
+SEGMENT_SECONDS = int(os.getenv("SEGMENT_SECONDS", "15"))
+TRANSCRIPTION_WORKERS = int(os.getenv("TRANSCRIPTION_WORKERS", "4"))
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", "1800"))
 
+segment_executor = ThreadPoolExecutor(
+    max_workers=TRANSCRIPTION_WORKERS, thread_name_prefix="segment"
+)
+upload_sessions = {}
+upload_sessions_lock = threading.Lock()
 
-def medical_transcription(audio_file_path: str) -> str:
+# Background transcription jobs. Audio is hashed on arrival; a duplicate of a
+# queued, running or recently finished job (within JOB_RESULT_TTL) shares it.
+# Job state is kept in SQLite: in memory by default, or in the file at
+# JOB_STORE_PATH so every worker process on the host sees every job.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "100"))
+JOB_MAX_QUEUE_BYTES = int(os.getenv("JOB_MAX_QUEUE_BYTES", str(256 * 1024 * 1024)))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "")
+
+# Refinement: in "auto" mode a local terminology index corrects known
+# mishearings and flags near-misses of lexicon terms; only sentences with
+# flagged words go to the model, and clean transcripts skip it entirely.
+# "full" sends every transcript through the model as before.
+REFINEMENT_MODE = os.getenv("REFINEMENT_MODE", "auto")
+TERMINOLOGY_LEXICON_PATH = os.getenv(
+    "TERMINOLOGY_LEXICON_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "medical_lexicon.txt"),
+)
+TERMINOLOGY_FUZZY_CUTOFF = float(os.getenv("TERMINOLOGY_FUZZY_CUTOFF", "0.84"))
+
+# Translations are cached per sentence. Bump TRANSLATION_PROMPT_VERSION
+# whenever the translation prompt changes so stale entries stop matching.
+TRANSLATION_MODEL = "gpt-3.5-turbo"
+TRANSLATION_PROMPT_VERSION = "2"
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "2048"))
+TRANSLATION_STREAM_AHEAD = int(os.getenv("TRANSLATION_STREAM_AHEAD", "4"))
+# Long transcripts are translated in chunks of about TRANSLATION_CHUNK_TOKENS
+# source tokens, TRANSLATION_PARALLELISM at a time per request. Each chunk
+# sees the TRANSLATION_CONTEXT_SENTENCES source sentences before it.
+TRANSLATION_CHUNK_TOKENS = int(os.getenv("TRANSLATION_CHUNK_TOKENS", "800"))
+TRANSLATION_PARALLELISM = int(os.getenv("TRANSLATION_PARALLELISM", "4"))
+TRANSLATION_CONTEXT_SENTENCES = int(os.getenv("TRANSLATION_CONTEXT_SENTENCES", "2"))
+# One transcript may be translated into up to TRANSLATION_MAX_LANGUAGES at
+# once. Texts up to TRANSLATION_PACK_TOKENS go out as a single request
+# covering every language instead of one request per language.
+TRANSLATION_MAX_LANGUAGES = int(os.getenv("TRANSLATION_MAX_LANGUAGES", "5"))
+TRANSLATION_PACK_TOKENS = int(os.getenv("TRANSLATION_PACK_TOKENS", "300"))
+# Short translations (uncached text up to TRANSLATE_BATCH_ITEM_TOKENS) from
+# concurrent requests are held for TRANSLATE_BATCH_WINDOW_MS and sent
+# together, up to TRANSLATE_BATCH_MAX sentences per request. 0 disables it.
+TRANSLATE_BATCH_WINDOW_MS = float(os.getenv("TRANSLATE_BATCH_WINDOW_MS", "10"))
+TRANSLATE_BATCH_MAX = int(os.getenv("TRANSLATE_BATCH_MAX", "16"))
+TRANSLATE_BATCH_ITEM_TOKENS = int(os.getenv("TRANSLATE_BATCH_ITEM_TOKENS", "60"))
+# Optional disk tier shared by every worker process on the host. Off unless
+# TRANSLATION_CACHE_PATH is set, since it holds fragments of patient
+# conversations; the file is created readable by its owner only. Rows older
+# than TRANSLATION_CACHE_TTL seconds, and the oldest beyond
+# TRANSLATION_CACHE_MAX_ROWS, are pruned as new ones are written.
+TRANSLATION_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", "")
+TRANSLATION_CACHE_TTL = int(os.getenv("TRANSLATION_CACHE_TTL", "604800"))
+TRANSLATION_CACHE_MAX_ROWS = int(os.getenv("TRANSLATION_CACHE_MAX_ROWS", "100000"))
+
+
+class Metrics:
+    """
+    Process-local counters, gauges and histograms, rendered in the Prometheus
+    text format by /metrics. Each gunicorn worker keeps its own.
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.help = {}
+        self.buckets = {}
+
+    def describe(self, name: str, kind: str, text: str, buckets=None):
+        self.help[name] = (kind, text)
+        if buckets is not None:
+            self.buckets[name] = buckets
+
+    @staticmethod
+    def _key(name: str, labels: dict):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def add_gauge(self, name: str, amount: float, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.gauges[key] = self.gauges.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        bounds = self.buckets.get(name, self.BUCKETS)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * len(bounds), 0.0, 0]
+            for i, bound in enumerate(bounds):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    @staticmethod
+    def _labels(labels, extra=()) -> str:
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(
+            '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+            for k, v in pairs
+        ) + "}"
+
+    def render(self, extra_gauges=()) -> str:
+        """
+        Renders every metric, plus (name, labels, value) gauges computed by
+        the caller at scrape time.
+        """
+        samples = {}
+        with self.lock:
+            for (name, labels), value in self.counters.items():
+                samples.setdefault(name, []).append(f"{name}{self._labels(labels)} {value}")
+            for (name, labels), value in self.gauges.items():
+                samples.setdefault(name, []).append(f"{name}{self._labels(labels)} {value}")
+            for (name, labels), (buckets, total, count) in self.histograms.items():
+                lines = samples.setdefault(name, [])
+                for bound, bucket_count in zip(self.buckets.get(name, self.BUCKETS), buckets):
+                    lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {bucket_count}")
+                lines.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{self._labels(labels)} {total}")
+                lines.append(f"{name}_count{self._labels(labels)} {count}")
+        for name, labels, value in extra_gauges:
+            samples.setdefault(name, []).append(
+                f"{name}{self._labels(sorted(labels.items()))} {value}"
+            )
+        output = []
+        for name in sorted(samples):
+            if name in self.help:
+                kind, text = self.help[name]
+                output.append(f"# HELP {name} {text}")
+                output.append(f"# TYPE {name} {kind}")
+            output.extend(samples[name])
+        return "\n".join(output) + "\n"
+
+
+metrics = Metrics()
+metrics.describe("app_stage_seconds", "histogram", "Time spent in each pipeline stage.")
+metrics.describe("app_stage_errors_total", "counter", "Pipeline stages that raised an error.")
+metrics.describe("app_http_request_seconds", "histogram", "Time to produce a response, by endpoint.")
+metrics.describe("app_http_requests_total", "counter", "Responses sent, by endpoint and status.")
+metrics.describe("app_http_requests_in_flight", "gauge", "Requests being handled, by endpoint.")
+metrics.describe("app_upstream_request_seconds", "histogram", "OpenAI request attempts, by operation.")
+metrics.describe("app_upstream_errors_total", "counter", "Failed OpenAI request attempts, by operation and error.")
+metrics.describe("app_upstream_in_flight", "gauge", "OpenAI calls in flight.")
+metrics.describe("app_upstream_queued", "gauge", "OpenAI calls waiting for a slot.")
+metrics.describe("app_job_wait_seconds", "histogram", "Time jobs spend queued.")
+metrics.describe("app_job_run_seconds", "histogram", "Time jobs spend running.")
+metrics.describe("app_jobs_queued", "gauge", "Jobs waiting for a worker.")
+metrics.describe("app_jobs_running", "gauge", "Jobs being processed.")
+metrics.describe("app_translation_batch_size", "histogram",
+                 "Sentences per coalesced translation request.", buckets=(1, 2, 4, 8, 16, 32, 64))
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """
+    Records how long the enclosed block takes as one `stage` observation,
+    and counts it as a stage error if it raises.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        metrics.inc("app_stage_errors_total", stage=stage)
+        raise
+    finally:
+        metrics.observe("app_stage_seconds", time.perf_counter() - started, stage=stage)
+
+
+@app.before_request
+def _track_request_start():
+    endpoint = request.endpoint or "unknown"
+    request.environ["app.started"] = time.perf_counter()
+    request.environ["app.in_flight"] = endpoint
+    metrics.add_gauge("app_http_requests_in_flight", 1, endpoint=endpoint)
+
+
+@app.teardown_request
+def _track_request_end(error=None):
+    # Streamed responses can be torn down twice; count each request once.
+    endpoint = request.environ.pop("app.in_flight", None)
+    if endpoint is not None:
+        metrics.add_gauge("app_http_requests_in_flight", -1, endpoint=endpoint)
+
+
+@app.after_request
+def _track_request_time(response):
+    # For streamed responses this is the time until the stream starts.
+    endpoint = request.endpoint or "unknown"
+    started = request.environ.get("app.started")
+    if started is not None:
+        metrics.observe("app_http_request_seconds", time.perf_counter() - started, endpoint=endpoint)
+    metrics.inc("app_http_requests_total", endpoint=endpoint, status=response.status_code)
+    return response
+
+
+class UpstreamBusyError(Exception):
+    """
+    Raised when an upstream call is refused because too many are already
+    in flight or queued. Routes turn it into a 503 with Retry-After.
+    """
+
+
+_RETRYABLE_ERRORS = (
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class UpstreamClient:
+    """
+    Runs OpenAI requests on a background event loop with a shared AsyncOpenAI
+    client. Synchronous callers (request handlers, worker pools) block on the
+    result while the loop multiplexes every in-flight request over one
+    connection pool. The loop is started lazily so each forked worker process
+    gets its own.
+    """
+
+    def __init__(self, concurrency: int, queue_limit: int):
+        self.concurrency = concurrency
+        self.queue_limit = queue_limit
+        self.lock = threading.Lock()
+        self.loop = None
+        self.pid = None
+        self.admitted = 0
+        self.active = 0
+        self.counters = {"rejected": 0, "retries": 0, "timeouts": 0, "errors": 0}
+
+    def _make_client(self):
+        return openai.AsyncOpenAI(
+            api_key=openai_api_key, timeout=OPENAI_TIMEOUT, max_retries=0
+        )
+
+    async def _make_semaphore(self):
+        return asyncio.Semaphore(self.concurrency)
+
+    def _ensure_loop(self):
+        with self.lock:
+            if self.loop is None or self.pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="upstream", daemon=True
+                ).start()
+                self.client = self._make_client()
+                self.semaphore = asyncio.run_coroutine_threadsafe(
+                    self._make_semaphore(), loop
+                ).result()
+                self.loop, self.pid = loop, os.getpid()
+            return self.loop
+
+    @staticmethod
+    def _backoff(attempt: int, error: Exception) -> float:
+        # Full jitter, but never sooner than the server's Retry-After.
+        delay = random.uniform(0, min(OPENAI_BACKOFF_MAX, OPENAI_BACKOFF_BASE * 2 ** attempt))
+        response = getattr(error, "response", None)
+        try:
+            retry_after = float(response.headers.get("retry-after", 0))
+        except (AttributeError, TypeError, ValueError):
+            retry_after = 0
+        return min(OPENAI_BACKOFF_MAX, max(delay, retry_after))
+
+    @staticmethod
+    def _record_attempt(operation: str, started: float, error: Exception = None):
+        metrics.observe("app_upstream_request_seconds",
+                        time.perf_counter() - started, operation=operation)
+        if error is not None:
+            metrics.inc("app_upstream_errors_total", operation=operation,
+                        error=type(error).__name__)
+
+    def _count(self, name: str):
+        # Counters are read by request threads (stats) while the loop updates
+        # them, so every change goes through the lock.
+        with self.lock:
+            self.counters[name] += 1
+
+    def _set_active(self, delta: int):
+        with self.lock:
+            self.active += delta
+
+    async def _run(self, request, operation: str, can_retry=lambda: True):
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), UPSTREAM_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._count("rejected")
+            raise UpstreamBusyError("Server is busy, please retry shortly")
+        self._set_active(1)
+        try:
+            for attempt in range(OPENAI_MAX_RETRIES + 1):
+                started = time.perf_counter()
+                try:
+                    result = await request(self.client)
+                except _RETRYABLE_ERRORS as e:
+                    self._record_attempt(operation, started, e)
+                    if isinstance(e, openai.APITimeoutError):
+                        self._count("timeouts")
+                    if attempt == OPENAI_MAX_RETRIES or not can_retry():
+                        self._count("errors")
+                        raise
+                    self._count("retries")
+                    await asyncio.sleep(self._backoff(attempt, e))
+                except openai.OpenAIError as e:
+                    self._record_attempt(operation, started, e)
+                    self._count("errors")
+                    raise
+                else:
+                    self._record_attempt(operation, started)
+                    return result
+        finally:
+            self._set_active(-1)
+            self.semaphore.release()
+
+    def _admit(self):
+        with self.lock:
+            if self.admitted >= self.concurrency + self.queue_limit:
+                self.counters["rejected"] += 1
+                raise UpstreamBusyError("Server is busy, please retry shortly")
+            self.admitted += 1
+
+    def _leave(self):
+        with self.lock:
+            self.admitted -= 1
+
+    def call(self, request, operation: str = "chat"):
+        """
+        Runs `request(client)` (a coroutine factory) on the upstream loop and
+        returns its result. Raises UpstreamBusyError straight away when the
+        in-flight and queued calls already fill the configured limits.
+        """
+        loop = self._ensure_loop()
+        self._admit()
+        try:
+            return asyncio.run_coroutine_threadsafe(
+                self._run(request, operation), loop
+            ).result()
+        finally:
+            self._leave()
+
+    def stream_chat(self, **kwargs):
+        """
+        Starts a streamed chat completion and returns a generator of content
+        deltas. Admission happens before this returns, so a busy server is
+        reported before any response has been sent. Tokens are buffered as
+        they arrive, so several streams can run while one is being read. A
+        failed call is only retried if it had not produced any tokens yet.
+        """
+        loop = self._ensure_loop()
+        self._admit()
+        deltas = queue.Queue()
+        started = []
+
+        async def consume(client):
+            stream = await client.chat.completions.create(stream=True, **kwargs)
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    started.append(True)
+                    deltas.put(delta)
+
+        def finished(future):
+            self._leave()
+            deltas.put(future)
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._run(consume, "chat_stream", can_retry=lambda: not started), loop
+        )
+        future.add_done_callback(finished)
+        return UpstreamStream(future, deltas)
+
+    def chat(self, **kwargs):
+        return self.call(lambda c: c.chat.completions.create(**kwargs), "chat")
+
+    def transcribe(self, **kwargs):
+        return self.call(lambda c: c.audio.transcriptions.create(**kwargs), "transcription")
+
+    def stats(self) -> dict:
+        with self.lock:
+            return dict(
+                self.counters,
+                inFlight=self.active,
+                queued=self.admitted - self.active,
+                concurrency=self.concurrency,
+                queueLimit=self.queue_limit,
+            )
+
+
+class UpstreamStream:
+    """
+    Iterator over the content deltas of a streamed completion started by
+    UpstreamClient.stream_chat. Closing it cancels the upstream call.
+    """
+
+    def __init__(self, future, deltas):
+        self.future = future
+        self.deltas = deltas
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = self.deltas.get()
+        if item is self.future:
+            self.deltas.put(item)  # keep later calls ending the same way
+            item.result()  # re-raise the upstream error, if any
+            raise StopIteration
+        return item
+
+    def close(self):
+        self.future.cancel()
+
+
+upstream = UpstreamClient(UPSTREAM_CONCURRENCY, UPSTREAM_QUEUE_LIMIT)
+
+
+def _describe_error(e: Exception):
+    """
+    Maps an exception raised while serving a request to (message, status).
+    """
+    if isinstance(e, UpstreamBusyError):
+        return str(e), 503
+    if isinstance(e, openai.RateLimitError):
+        return "Upstream rate limit reached, please retry shortly", 429
+    if isinstance(e, openai.APITimeoutError):
+        return "Upstream request timed out", 504
+    return str(e), 500
+
+
+def _error_response(e: Exception):
     """
-    Transcribes an audio file using OpenAI's Whisper API (gpt-4o-transcribe) 
-    and refines the transcript for medical accuracy.
+    Maps an exception raised while serving a request to a JSON error reply.
     """
-    # Step 1: Transcribe audio using the Whisper API
-    with open(audio_file_path, "rb") as audio_file:
-        transcription = client.audio.transcriptions.create(
+    message, status = _describe_error(e)
+    response = jsonify({"error": message})
+    if status == 503:
+        response.headers["Retry-After"] = "1"
+    return response, status
+
+
+def transcribe_audio(audio, filename: str = "recording.webm") -> str:
+    """
+    Transcribes audio using OpenAI's Whisper API (gpt-4o-transcribe).
+
+    `audio` may be raw bytes or a readable file-like object; it is sent from
+    memory, so no temporary file is needed.
+    """
+    if hasattr(audio, "read"):
+        with stage_timer("upload_read"):
+            audio = audio.read()  # keep the bytes so retries can resend them
+    with stage_timer("transcription"):
+        transcription = upstream.transcribe(
             model="gpt-4o-transcribe",
-            file=audio_file
+            file=(filename, audio)
         )
-    raw_transcript = transcription.text
+    return transcription.text
+
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z'-]*")
+
+
+class TerminologyIndex:
+    """
+    Local medical terminology engine built from the lexicon file. An
+    Aho-Corasick automaton over every lexicon term and known mishearing
+    finds whole-word matches in a single pass over the transcript. Words
+    outside any match that are neither lexicon words nor listed everyday
+    words are compared with lexicon words of similar length to flag
+    near-misses.
+    """
+
+    def __init__(self, terms, corrections: dict, ignored, possible: dict = None):
+        self.possible = dict(possible or {})
+        self.replacements = dict.fromkeys(terms)
+        self.replacements.update(dict.fromkeys(self.possible))
+        self.replacements.update(corrections)
+        lexicon_words = {word for term in terms for word in term.split()}
+        self.known_words = lexicon_words | set(ignored)
+        self.words_by_length = {}
+        for word in lexicon_words:
+            if len(word) >= 5:
+                self.words_by_length.setdefault(len(word), []).append(word)
+        self.near_miss_cache = {}
+        self.lock = threading.Lock()
+        self._build(self.replacements)
 
-    # Step 2: Refine the transcript with a chat prompt
+    @classmethod
+    def load(cls, path: str):
+        terms, corrections, ignored, possible = [], {}, [], {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip().lower()
+                if not line:
+                    continue
+                if line.startswith("!"):
+                    ignored.append(line[1:].strip())
+                elif "?=>" in line:
+                    heard, correct = (part.strip() for part in line.split("?=>", 1))
+                    possible[" ".join(heard.split())] = correct
+                elif "=>" in line:
+                    heard, correct = (part.strip() for part in line.split("=>", 1))
+                    corrections[" ".join(heard.split())] = correct
+                else:
+                    terms.append(" ".join(line.split()))
+        return cls(terms, corrections, ignored, possible)
+
+    def _build(self, patterns):
+        self.goto, self.fail, self.output = [{}], [0], [[]]
+        for pattern in patterns:
+            state = 0
+            for ch in pattern:
+                if ch not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][ch] = len(self.goto) - 1
+                state = self.goto[state][ch]
+            self.output[state].append(pattern)
+        frontier = list(self.goto[0].values())
+        while frontier:
+            next_frontier = []
+            for state in frontier:
+                for ch, child in self.goto[state].items():
+                    fallback = self.fail[state]
+                    while fallback and ch not in self.goto[fallback]:
+                        fallback = self.fail[fallback]
+                    self.fail[child] = self.goto[fallback].get(ch, 0)
+                    if self.fail[child] == child:
+                        self.fail[child] = 0
+                    self.output[child] = self.output[child] + self.output[self.fail[child]]
+                    next_frontier.append(child)
+            frontier = next_frontier
+
+    def matches(self, text: str) -> list:
+        """
+        Returns non-overlapping (start, end, pattern) whole-word matches,
+        preferring the leftmost and then the longest.
+        """
+        found, state = [], 0
+        for end, ch in enumerate(text, 1):
+            ch = ch.lower()
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for pattern in self.output[state]:
+                start = end - len(pattern)
+                if ((start == 0 or not text[start - 1].isalnum())
+                        and (end == len(text) or not text[end].isalnum())):
+                    found.append((start, end, pattern))
+        found.sort(key=lambda m: (m[0], m[0] - m[1]))
+        chosen, last_end = [], 0
+        for match in found:
+            if match[0] >= last_end:
+                chosen.append(match)
+                last_end = match[1]
+        return chosen
+
+    def correct(self, text: str):
+        """
+        Applies the deterministic corrections. Returns (text, corrections made).
+        Possible mishearings are left for near_misses to flag.
+        """
+        parts, position, count = [], 0, 0
+        for start, end, pattern in self.matches(text):
+            replacement = self.replacements[pattern]
+            if replacement is None:
+                continue
+            if text[start].isupper():
+                replacement = replacement[0].upper() + replacement[1:]
+            parts.append(text[position:start])
+            parts.append(replacement)
+            position = end
+            count += 1
+        parts.append(text[position:])
+        return "".join(parts), count
+
+    def _near_miss(self, word: str) -> list:
+        # Plurals and singulars of known words are known too.
+        if (len(word) < 5 or word in self.known_words
+                or word.rstrip("s") in self.known_words
+                or (word.endswith("es") and word[:-2] in self.known_words)
+                or word + "s" in self.known_words or word + "es" in self.known_words):
+            return []
+        with self.lock:
+            if word in self.near_miss_cache:
+                return self.near_miss_cache[word]
+        pool = [candidate for length in range(len(word) - 2, len(word) + 3)
+                for candidate in self.words_by_length.get(length, ())]
+        candidates = difflib.get_close_matches(word, pool, n=3, cutoff=TERMINOLOGY_FUZZY_CUTOFF)
+        with self.lock:
+            if len(self.near_miss_cache) > 20000:
+                self.near_miss_cache.clear()
+            self.near_miss_cache[word] = candidates
+        return candidates
+
+    def near_misses(self, text: str) -> list:
+        """
+        Returns (start, end, word, candidates) for every word that looks like
+        a misheard lexicon term, and for every possible mishearing made of
+        everyday words. Words inside other lexicon matches are trusted.
+        """
+        trusted = self.matches(text)
+        suspects = [(start, end, text[start:end], [self.possible[pattern]])
+                    for start, end, pattern in trusted if pattern in self.possible]
+        t = 0
+        for m in _WORD.finditer(text):
+            while t < len(trusted) and trusted[t][1] <= m.start():
+                t += 1
+            if t < len(trusted) and trusted[t][0] <= m.start():
+                continue
+            candidates = self._near_miss(m.group().lower())
+            if candidates:
+                suspects.append((m.start(), m.end(), m.group(), candidates))
+        return sorted(suspects)
+
+
+_terminology_index = None
+_terminology_lock = threading.Lock()
+
+
+def terminology_index() -> TerminologyIndex:
+    """
+    Returns the terminology index, building it on first use so worker
+    start-up does not pay for loading the lexicon.
+    """
+    global _terminology_index
+    if _terminology_index is None:
+        with _terminology_lock:
+            if _terminology_index is None:
+                _terminology_index = TerminologyIndex.load(TERMINOLOGY_LEXICON_PATH)
+    return _terminology_index
+
+
+refinement_counters = {
+    "skipped": 0, "partial": 0, "full": 0, "corrections": 0, "suspectWords": 0,
+}
+refinement_counters_lock = threading.Lock()
+
+
+def _count_refinement(outcome: str, corrections: int = 0, suspects: int = 0):
+    with refinement_counters_lock:
+        refinement_counters[outcome] += 1
+        refinement_counters["corrections"] += corrections
+        refinement_counters["suspectWords"] += suspects
+
+
+def refinement_stats() -> dict:
+    with refinement_counters_lock:
+        stats = dict(refinement_counters, mode=REFINEMENT_MODE)
+    total = stats["skipped"] + stats["partial"] + stats["full"]
+    stats["skipRate"] = stats["skipped"] / total if total else 0.0
+    return stats
+
+
+def _refinement_request(raw_transcript: str) -> dict:
     prompt = (
         "Please refine the following transcript for accuracy, "
         "especially ensuring that any medical terminology is correct, "
         "and fix any transcription errors:\n\n" + raw_transcript
     )
-
-    refinement_response = client.chat.completions.create(
+    return dict(
         model="gpt-3.5-turbo",  # or another suitable chat model
         messages=[{"role": "user", "content": prompt}],
         max_tokens=4000,
@@ -40,72 +724,1444 @@ def medical_transcription(audio_file_path: str) -> str:
         n=1
     )
 
-    refined_transcript = refinement_response.choices[0].message.content.strip()
-    return refined_transcript
 
-def translate_text(text: str, target_language: str) -> str:
+def _refine_full(raw_transcript: str) -> str:
+    with stage_timer("refinement"):
+        refinement_response = upstream.chat(**_refinement_request(raw_transcript))
+    return refinement_response.choices[0].message.content.strip()
+
+
+def _refine_sentences(sentences: list, suspects: list):
     """
-    Translates the given text into the target language using a chat-based approach.
+    Asks the model to fix only the given sentences, naming the words the
+    terminology index flagged. Returns the corrected sentences, or None if
+    the reply does not line up with the input.
+    """
+    hints = "; ".join(
+        f"{word} (maybe {' or '.join(candidates)})" for _, _, word, candidates in suspects
+    )
+    source = json.dumps(sentences, ensure_ascii=False)
+    with stage_timer("refinement"):
+        response = upstream.chat(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": (
+                    "Each item of the JSON array below is a sentence from a medical "
+                    "consultation transcript. Fix transcription errors, especially "
+                    "misheard medical terminology, and change nothing else. "
+                    f"Possibly misheard words: {hints}. Reply with a JSON object "
+                    '{"sentences": [...]} holding exactly one corrected string per '
+                    "item, in the same order."
+                )},
+                {"role": "user", "content": source}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.3,
+            max_tokens=_max_output_tokens(estimate_tokens(source)),
+            n=1
+        )
+    try:
+        refined = json.loads(response.choices[0].message.content)["sentences"]
+        if len(refined) == len(sentences) and all(isinstance(r, str) for r in refined):
+            return [r.strip() for r in refined]
+    except (ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def refine_transcript(raw_transcript: str) -> str:
+    """
+    Refines a raw transcript, fixing medical terminology and transcription
+    errors. In "auto" mode the terminology index applies known corrections
+    and only sentences with suspect words are sent to the model; if nothing
+    is flagged the model is not called at all.
+    """
+    if not raw_transcript.strip():
+        return ""
+    if REFINEMENT_MODE == "full":
+        _count_refinement("full")
+        return _refine_full(raw_transcript)
+
+    with stage_timer("terminology"):
+        index = terminology_index()
+        text, corrections = index.correct(raw_transcript)
+        suspects = index.near_misses(text)
+    if not suspects:
+        _count_refinement("skipped", corrections)
+        return text.strip()
+
+    pairs = split_sentences(text)
+    offsets, position = [], 0
+    for sentence, separator in pairs:
+        offsets.append((position, position + len(sentence)))
+        position += len(sentence) + len(separator)
+    flagged = [i for i, (start, end) in enumerate(offsets)
+               if any(start <= s[0] < end for s in suspects)]
+    refined = _refine_sentences([pairs[i][0] for i in flagged], suspects)
+    if refined is None:
+        _count_refinement("full", corrections, len(suspects))
+        return _refine_full(text)
+    _count_refinement("partial", corrections, len(suspects))
+    return _reassemble(pairs, dict(zip(flagged, refined)))
+
+
+def stream_refined_transcript(raw_transcript: str):
+    """
+    Streaming variant of refine_transcript. In "full" mode the refinement is
+    streamed as model tokens arrive; in "auto" mode the model sees at most a
+    few sentences, so the refined transcript is yielded in one piece.
+    """
+    if not raw_transcript.strip():
+        return iter(())
+    if REFINEMENT_MODE == "full":
+        _count_refinement("full")
+        return _timed_stream("refinement", upstream.stream_chat(**_refinement_request(raw_transcript)))
+    return iter([refine_transcript(raw_transcript)])
+
+
+def _timed_stream(stage: str, stream):
+    """
+    Yields from `stream`, recording the time until it is exhausted or
+    closed as one `stage` observation.
+    """
+    with stage_timer(stage):
+        yield from stream
+
+
+def medical_transcription(audio, filename: str = "recording.webm") -> str:
+    """
+    Transcribes audio and refines the transcript for medical accuracy.
+    """
+    return refine_transcript(transcribe_audio(audio, filename))
+
+_SENTENCE_BREAK = re.compile(r"((?<=[.!?\u3002\uff01\uff1f])\s+|\s*\n\s*)")
+_ABBREVIATION = re.compile(
+    r"\b(?:Dr|Mr|Mrs|Ms|Prof|St|vs|approx|e\.g|i\.e|etc)\.$",
+    re.IGNORECASE,
+)
+# "No." only abbreviates "number" when a number follows it ("No. 4").
+# Units such as "mg." are left out: they end sentences far more often than
+# they carry a period mid-sentence.
+_NUMBER_ABBREVIATION = re.compile(r"\bNo\.$")
+
+
+def split_sentences(text: str) -> list:
+    """
+    Splits text into (sentence, separator) pairs. Joining every pair back
+    together reproduces the original text, so translated sentences can be
+    reassembled with the original spacing and paragraph breaks.
+    """
+    parts = _SENTENCE_BREAK.split(text)
+    pairs = []
+    for i in range(0, len(parts), 2):
+        sentence = parts[i]
+        separator = parts[i + 1] if i + 1 < len(parts) else ""
+        if pairs and "\n" not in pairs[-1][1] and (
+            _ABBREVIATION.search(pairs[-1][0])
+            or (_NUMBER_ABBREVIATION.search(pairs[-1][0]) and sentence[:1].isdigit())
+        ):
+            previous, previous_separator = pairs.pop()
+            sentence = previous + previous_separator + sentence
+        pairs.append((sentence, separator))
+    return pairs
+
+
+def normalize_sentence(sentence: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", sentence).split())
+
+
+def _open_private_db(path: str, **connect_args) -> sqlite3.Connection:
+    """
+    Opens an SQLite file shared between processes, creating it with owner-only
+    permissions first. SQLite gives its WAL and shared-memory files the same
+    permissions as the database.
+    """
+    os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+    os.chmod(path, 0o600)
+    db = sqlite3.connect(path, timeout=5, **connect_args)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA mmap_size=67108864")
+    return db
+
+
+class TranslationCache:
+    """
+    Two-tier sentence translation cache: a bounded in-process LRU in front of
+    an optional SQLite file that every worker process on the host shares.
+    Keys hash the normalized sentence together with the target language,
+    model and prompt version. Disk rows expire after `ttl` seconds and are
+    capped at `max_rows`. Disk errors are counted and otherwise ignored; the
+    cache never fails a translation.
+    """
+
+    PRUNE_EVERY = 256
+
+    def __init__(self, max_entries: int, path: str, ttl: int = 0, max_rows: int = 0):
+        self.max_entries = max_entries
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.writes = 0
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.counters = {
+            "memoryHits": 0, "diskHits": 0, "misses": 0,
+            "evictions": 0, "diskErrors": 0, "diskPruned": 0,
+        }
+
+    @staticmethod
+    def key(sentence: str, target_language: str) -> str:
+        material = "\x1f".join((
+            normalize_sentence(sentence), target_language.strip().lower(),
+            TRANSLATION_MODEL, TRANSLATION_PROMPT_VERSION,
+        ))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _db(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = _open_private_db(self.path)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS translations "
+                "(key TEXT PRIMARY KEY, translation TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS translations_created ON translations (created)"
+            )
+            self.local.db = db
+        return db
+
+    def _oldest_valid(self) -> float:
+        return time.time() - self.ttl if self.ttl else 0.0
+
+    def _prune(self, db):
+        with db:
+            pruned = db.execute(
+                "DELETE FROM translations WHERE created < ?", (self._oldest_valid(),)
+            ).rowcount
+            if self.max_rows:
+                pruned += db.execute(
+                    "DELETE FROM translations WHERE key IN (SELECT key FROM translations "
+                    "ORDER BY created DESC LIMIT -1 OFFSET ?)", (self.max_rows,)
+                ).rowcount
+        with self.lock:
+            self.counters["diskPruned"] += pruned
+
+    def _remember(self, key: str, translation: str):
+        # Caller holds self.lock.
+        self.memory[key] = translation
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def get_many(self, sentences: list, target_language: str) -> dict:
+        """
+        Returns {index: translation} for every sentence found in either tier.
+        """
+        keys = {i: self.key(s, target_language) for i, s in enumerate(sentences)}
+        found, missing = {}, {}
+        with self.lock:
+            for i, key in keys.items():
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[i] = self.memory[key]
+                    self.counters["memoryHits"] += 1
+                else:
+                    missing[i] = key
+        if missing and self.path:
+            try:
+                placeholders = ",".join("?" * len(missing))
+                rows = dict(self._db().execute(
+                    f"SELECT key, translation FROM translations "
+                    f"WHERE key IN ({placeholders}) AND created >= ?",
+                    list(set(missing.values())) + [self._oldest_valid()],
+                ).fetchall())
+            except (sqlite3.Error, OSError) as e:
+                app.logger.warning("Translation cache read failed: %s", e)
+                rows = {}
+                with self.lock:
+                    self.counters["diskErrors"] += 1
+            with self.lock:
+                for i, key in list(missing.items()):
+                    if key in rows:
+                        found[i] = rows[key]
+                        self._remember(key, rows[key])
+                        self.counters["diskHits"] += 1
+                        del missing[i]
+        with self.lock:
+            self.counters["misses"] += len(missing)
+        return found
+
+    def put_many(self, pairs: list, target_language: str):
+        """
+        Stores (sentence, translation) pairs in both tiers.
+        """
+        entries = [(self.key(s, target_language), t) for s, t in pairs]
+        with self.lock:
+            for key, translation in entries:
+                self._remember(key, translation)
+        if self.path:
+            now = time.time()
+            with self.lock:
+                self.writes += 1
+                prune = (self.writes - 1) % self.PRUNE_EVERY == 0
+            try:
+                db = self._db()
+                with db:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO translations (key, translation, created) "
+                        "VALUES (?, ?, ?)",
+                        [(key, t, now) for key, t in entries],
+                    )
+                if prune:
+                    self._prune(db)
+            except (sqlite3.Error, OSError) as e:
+                app.logger.warning("Translation cache write failed: %s", e)
+                with self.lock:
+                    self.counters["diskErrors"] += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            stats = dict(self.counters, entries=len(self.memory),
+                         maxEntries=self.max_entries)
+        lookups = stats["memoryHits"] + stats["diskHits"] + stats["misses"]
+        stats["hitRate"] = (
+            (stats["memoryHits"] + stats["diskHits"]) / lookups if lookups else 0.0
+        )
+        return stats
+
+
+translation_cache = TranslationCache(
+    TRANSLATION_CACHE_SIZE, TRANSLATION_CACHE_PATH,
+    TRANSLATION_CACHE_TTL, TRANSLATION_CACHE_MAX_ROWS,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate: about four ASCII characters per token, and one
+    token per other character (accented letters, CJK, Arabic, ...), which
+    errs on the high side for non-English text.
     """
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def _max_output_tokens(source_tokens: int) -> int:
+    # Translations can run to a few times the source length in other scripts.
+    return min(4000, max(500, 3 * source_tokens + 100))
+
+
+def _translation_system_prompt(instruction: str, context: str) -> str:
+    if not context:
+        return instruction
+    return (
+        instruction + "\n\nFor consistent terminology, this is the text that "
+        "comes just before it. Do not translate it:\n" + context
+    )
+
+
+def _translation_request(text: str, target_language: str, context: str = "") -> dict:
+    return dict(
+        model=TRANSLATION_MODEL,
         messages=[
-            {"role": "system", "content": f"Translate the following text into {target_language}:"},
+            {"role": "system", "content": _translation_system_prompt(
+                f"Translate the following text into {target_language}:", context
+            )},
             {"role": "user", "content": text}
         ],
         temperature=0.3,
-        max_tokens=500,
+        max_tokens=_max_output_tokens(estimate_tokens(text)),
+        n=1
+    )
+
+
+def _translate_one(text: str, target_language: str, context: str = "") -> str:
+    response = upstream.chat(**_translation_request(text, target_language, context))
+    return response.choices[0].message.content.strip()
+
+
+# Per-sentence fallback calls share one process-wide pool, so chunk workers
+# that all fall back at once add at most TRANSLATION_PARALLELISM calls in
+# flight rather than a pool's worth each.
+fallback_executor = ThreadPoolExecutor(
+    max_workers=TRANSLATION_PARALLELISM, thread_name_prefix="translate-fallback"
+)
+
+
+def _translate_sentences(sentences: list, target_language: str, context: str = "") -> list:
+    """
+    Translates a list of sentences, returning one translation per sentence.
+    Several sentences are sent as a single numbered JSON request; if the reply
+    does not line up with the input, the sentences are translated one per
+    request on `fallback_executor`.
+    """
+    if len(sentences) == 1:
+        return [_translate_one(sentences[0], target_language, context)]
+    source = json.dumps(sentences, ensure_ascii=False)
+    response = upstream.chat(
+        model=TRANSLATION_MODEL,
+        messages=[
+            {"role": "system", "content": _translation_system_prompt(
+                f"Translate each item of the JSON array below into {target_language}. "
+                'Reply with a JSON object {"translations": [...]} holding exactly one '
+                "translated string per item, in the same order.", context
+            )},
+            {"role": "user", "content": source}
+        ],
+        response_format={"type": "json_object"},
+        temperature=0.3,
+        max_tokens=_max_output_tokens(estimate_tokens(source)),
         n=1
     )
-    translation = response.choices[0].message.content.strip()
-    return translation
+    try:
+        translations = json.loads(response.choices[0].message.content)["translations"]
+        if len(translations) == len(sentences) and all(isinstance(t, str) for t in translations):
+            return [t.strip() for t in translations]
+    except (ValueError, KeyError, TypeError):
+        pass
+    return list(fallback_executor.map(
+        lambda sentence: _translate_one(sentence, target_language, context), sentences
+    ))
+
+
+class TranslationCoalescer:
+    """
+    Micro-batches short translations across concurrent requests. Sentences
+    for the same target language are held for a short window and sent as one
+    numbered request through _translate_sentences, which falls back to
+    individual calls if the reply cannot be split. A sentence that is
+    already waiting or in flight is not sent twice; later callers share the
+    first caller's result.
+    """
+
+    def __init__(self, window_ms: float, max_batch: int):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.lock = threading.Lock()
+        self.pending = {}   # language key -> open batch
+        self.inflight = {}  # cache key -> Future
+        self.batch_sizes = {}
+        self.counters = {"batches": 0, "items": 0, "singleFlightHits": 0}
+
+    def translate_many(self, sentences: list, target_language: str) -> list:
+        """
+        Queues the sentences and blocks until all of them are translated.
+        """
+        futures, full = [], []
+        language_key = target_language.strip().lower()
+        with self.lock:
+            for sentence in sentences:
+                key = TranslationCache.key(sentence, target_language)
+                future = self.inflight.get(key)
+                if future is not None:
+                    self.counters["singleFlightHits"] += 1
+                    futures.append(future)
+                    continue
+                future = Future()
+                self.inflight[key] = future
+                futures.append(future)
+                batch = self.pending.get(language_key)
+                if batch is None:
+                    batch = {"language": target_language, "items": []}
+                    self.pending[language_key] = batch
+                    timer = threading.Timer(self.window, self._flush, (language_key, batch))
+                    timer.daemon = True
+                    timer.start()
+                batch["items"].append((key, sentence, future))
+                if len(batch["items"]) >= self.max_batch:
+                    del self.pending[language_key]
+                    full.append(batch)
+        for batch in full:
+            self._send(batch)
+        return [future.result() for future in futures]
+
+    def _flush(self, language_key: str, batch: dict):
+        with self.lock:
+            if self.pending.get(language_key) is not batch:
+                return  # already sent because it filled up
+            del self.pending[language_key]
+        self._send(batch)
+
+    def _send(self, batch: dict):
+        items = batch["items"]
+        with self.lock:
+            self.counters["batches"] += 1
+            self.counters["items"] += len(items)
+            self.batch_sizes[len(items)] = self.batch_sizes.get(len(items), 0) + 1
+        metrics.observe("app_translation_batch_size", len(items))
+        try:
+            translated = _translate_sentences(
+                [sentence for _, sentence, _ in items], batch["language"]
+            )
+        except Exception as e:
+            outcomes = [(future, None, e) for _, _, future in items]
+        else:
+            outcomes = [(future, t, None) for (_, _, future), t in zip(items, translated)]
+        with self.lock:
+            for key, _, _ in items:
+                self.inflight.pop(key, None)
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def stats(self) -> dict:
+        with self.lock:
+            stats = dict(self.counters, windowMs=self.window * 1000,
+                         maxBatch=self.max_batch,
+                         batchSizes={str(size): count for size, count
+                                     in sorted(self.batch_sizes.items())})
+        stats["meanBatchSize"] = (
+            stats["items"] / stats["batches"] if stats["batches"] else 0.0
+        )
+        return stats
+
+
+translation_coalescer = TranslationCoalescer(TRANSLATE_BATCH_WINDOW_MS, TRANSLATE_BATCH_MAX)
+
+
+def chunk_sentences(pairs: list, indices: list, budget: int) -> list:
+    """
+    Groups the sentence indices to translate into chunks of consecutive
+    sentences whose estimated size stays within `budget` tokens. A chunk is
+    also closed at a paragraph break once it is at least half full, and a
+    gap left by a cached sentence always starts a new chunk. A sentence
+    larger than the budget gets a chunk of its own.
+    """
+    chunks, current, size = [], [], 0
+    for i in indices:
+        tokens = estimate_tokens(pairs[i][0])
+        if current and (i != current[-1] + 1 or size + tokens > budget
+                        or ("\n" in pairs[current[-1]][1] and size >= budget / 2)):
+            chunks.append(current)
+            current, size = [], 0
+        current.append(i)
+        size += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _source_context(pairs: list, first: int) -> str:
+    start = max(0, first - TRANSLATION_CONTEXT_SENTENCES)
+    return "".join(s + sep for s, sep in pairs[start:first]).strip()
+
+
+def _reassemble(pairs: list, translations: dict) -> str:
+    return "".join(
+        translations.get(i, sentence) + separator
+        for i, (sentence, separator) in enumerate(pairs)
+    ).strip()
+
+
+def translate_document(text: str, target_language: str) -> dict:
+    """
+    Translates text of any length. Sentences already in the translation cache
+    are reused; the rest are grouped into chunks that are translated
+    concurrently, each with a little preceding source text as context, and
+    reassembled in order. Returns the translation together with a per-chunk
+    report: sentence count, estimated source tokens and seconds taken.
+    """
+    with stage_timer("translation"):
+        return _translate_document(text, target_language)
+
+
+def _translate_document(text: str, target_language: str) -> dict:
+    pairs = split_sentences(text)
+    with stage_timer("translation_cache"):
+        sentences = [sentence for sentence, _ in pairs]
+        translations = translation_cache.get_many(sentences, target_language)
+    missing = [i for i, sentence in enumerate(sentences)
+               if i not in translations and sentence.strip()]
+    # Short work is handed to the coalescer to share a request with others.
+    coalesce = (
+        bool(missing) and TRANSLATE_BATCH_WINDOW_MS > 0
+        and sum(estimate_tokens(sentences[i]) for i in missing) <= TRANSLATE_BATCH_ITEM_TOKENS
+    )
+    if coalesce:
+        chunks = [missing]
+    else:
+        chunks = chunk_sentences(pairs, missing, TRANSLATION_CHUNK_TOKENS)
+
+    def run(chunk):
+        with stage_timer("translation_chunk"):
+            return run_chunk(chunk)
+
+    def run_chunk(chunk):
+        started = time.monotonic()
+        if coalesce:
+            translated = translation_coalescer.translate_many(
+                [sentences[i] for i in chunk], target_language
+            )
+        else:
+            translated = _translate_sentences(
+                [sentences[i] for i in chunk], target_language,
+                _source_context(pairs, chunk[0]),
+            )
+        translation_cache.put_many(
+            list(zip([sentences[i] for i in chunk], translated)), target_language
+        )
+        return translated, {
+            "sentences": len(chunk),
+            "tokens": sum(estimate_tokens(sentences[i]) for i in chunk),
+            "seconds": round(time.monotonic() - started, 3),
+        }
+
+    if len(chunks) > 1:
+        with ThreadPoolExecutor(
+            max_workers=min(TRANSLATION_PARALLELISM, len(chunks)),
+            thread_name_prefix="translate",
+        ) as executor:
+            results = list(executor.map(run, chunks))
+    else:
+        results = [run(chunk) for chunk in chunks]
+
+    report = []
+    for chunk, (translated, chunk_report) in zip(chunks, results):
+        translations.update(zip(chunk, translated))
+        report.append(chunk_report)
+    return {
+        "translatedText": _reassemble(pairs, translations),
+        "cachedSentences": len(sentences) - len(missing),
+        "chunks": report,
+    }
+
+
+def translate_text(text: str, target_language: str) -> str:
+    """
+    Translates the given text into the target language using a chat-based approach.
+    """
+    return translate_document(text, target_language)["translatedText"]
+
+
+def stream_translation(text: str, target_language: str):
+    """
+    Streaming variant of translate_text: yields the translation in order as
+    it is produced. Cached sentences are yielded immediately; the rest are
+    grouped into the same chunks translate_document would send, one streamed
+    call per chunk, with up to TRANSLATION_STREAM_AHEAD chunks running ahead
+    of the one being read. A finished chunk is written back to the cache
+    when its translation splits into as many sentences as its source.
+    """
+    pairs = split_sentences(text.strip())
+    sentences = [sentence for sentence, _ in pairs]
+    with stage_timer("translation_cache"):
+        cached = translation_cache.get_many(sentences, target_language)
+    missing = [i for i, sentence in enumerate(sentences)
+               if i not in cached and sentence.strip()]
+    chunks = {chunk[0]: chunk for chunk in chunk_sentences(pairs, missing, TRANSLATION_CHUNK_TOKENS)}
+    streams = {}
+    unstarted = iter(chunks.values())
+
+    def start_next():
+        chunk = next(unstarted, None)
+        if chunk is not None:
+            source = "".join(pairs[i][0] + pairs[i][1] for i in chunk[:-1]) + pairs[chunk[-1]][0]
+            streams[chunk[0]] = upstream.stream_chat(**_translation_request(
+                source, target_language, _source_context(pairs, chunk[0])
+            ))
+
+    # Open the first streams before yielding so a busy server is reported
+    # as an error status rather than in the middle of the response. If one
+    # is refused, the ones already open are cancelled so they free their
+    # slots instead of finishing calls nobody will read.
+    try:
+        for _ in range(TRANSLATION_STREAM_AHEAD):
+            start_next()
+    except Exception:
+        for stream in streams.values():
+            stream.close()
+        raise
+
+    def generate():
+        try:
+            i = 0
+            while i < len(pairs):
+                if i in chunks:
+                    chunk = chunks[i]
+                    parts = []
+                    with stage_timer("translation_chunk"):
+                        for delta in streams[i]:
+                            parts.append(delta)
+                            yield delta
+                    del streams[i]
+                    start_next()
+                    translated = [t for t, _ in split_sentences("".join(parts).strip())]
+                    if len(translated) == len(chunk):
+                        translation_cache.put_many(
+                            list(zip([sentences[j] for j in chunk], translated)), target_language
+                        )
+                    i = chunk[-1]
+                else:
+                    yield cached.get(i, pairs[i][0])
+                if pairs[i][1]:
+                    yield pairs[i][1]
+                i += 1
+        finally:
+            for stream in streams.values():
+                stream.close()
+
+    return _timed_stream("translation", generate())
+
+
+def _translate_packed(text: str, target_languages: list) -> dict:
+    """
+    Translates a short text into several languages with one structured
+    request. Sentences cached for a language are reused. Returns
+    {language: translated text} for the languages whose part of the reply
+    lined up with the input; callers translate any others separately.
+    """
+    with stage_timer("translation_packed"):
+        return _translate_packed_once(text, target_languages)
+
+
+def _translate_packed_once(text: str, target_languages: list) -> dict:
+    pairs = split_sentences(text)
+    sentences = [sentence for sentence, _ in pairs]
+    with stage_timer("translation_cache"):
+        translations = {
+            language: translation_cache.get_many(sentences, language)
+            for language in target_languages
+        }
+    missing = [i for i, sentence in enumerate(sentences) if sentence.strip()
+               and any(i not in found for found in translations.values())]
+    if missing:
+        source = json.dumps([sentences[i] for i in missing], ensure_ascii=False)
+        response = upstream.chat(
+            model=TRANSLATION_MODEL,
+            messages=[
+                {"role": "system", "content": (
+                    "Translate each item of the JSON array below into each of these "
+                    f"languages: {', '.join(target_languages)}. Reply with a JSON object "
+                    "that maps each language name, exactly as written above, to an "
+                    "array holding one translated string per item, in the same order."
+                )},
+                {"role": "user", "content": source}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.3,
+            max_tokens=_max_output_tokens(estimate_tokens(source) * len(target_languages)),
+            n=1
+        )
+        try:
+            reply = json.loads(response.choices[0].message.content)
+        except (ValueError, TypeError):
+            reply = {}
+        if not isinstance(reply, dict):
+            reply = {}
+        for language in target_languages:
+            translated = reply.get(language)
+            if (not isinstance(translated, list) or len(translated) != len(missing)
+                    or not all(isinstance(t, str) for t in translated)):
+                del translations[language]
+                continue
+            new = [(i, t.strip()) for i, t in zip(missing, translated)
+                   if i not in translations[language]]
+            translations[language].update(new)
+            translation_cache.put_many(
+                [(sentences[i], t) for i, t in new], language
+            )
+    return {
+        language: _reassemble(pairs, found)
+        for language, found in translations.items()
+    }
+
+
+def translate_fanout(text: str, target_languages: list):
+    """
+    Translates one text into several languages, yielding (language, result)
+    pairs as each language finishes. Short texts are first tried as one
+    packed request; languages whose part of the reply did not line up are
+    translated concurrently, as are all of them if the packed request
+    fails, unless it was refused as busy or rate limited: then every
+    language reports that error.
+    A result holds the translation and the seconds it took, or the error
+    message and status for that language alone.
+    """
+    started = time.monotonic()
+    pending = list(target_languages)
+    if len(pending) > 1 and estimate_tokens(text) <= TRANSLATION_PACK_TOKENS:
+        try:
+            packed = _translate_packed(text, pending)
+        except (UpstreamBusyError, openai.RateLimitError) as e:
+            # A request per language would only add load to a server or
+            # account that is already refusing work.
+            message, status = _describe_error(e)
+            for language in pending:
+                yield language, {"error": message, "status": status}
+            return
+        except Exception as e:
+            # The packed reply is the longest call, so it is the likeliest
+            # to time out; smaller per-language requests may still succeed.
+            app.logger.warning("Packed translation failed, translating separately: %s", e)
+            packed = {}
+        seconds = round(time.monotonic() - started, 3)
+        for language, translated in packed.items():
+            yield language, {"translatedText": translated, "seconds": seconds, "packed": True}
+        pending = [language for language in pending if language not in packed]
+    if not pending:
+        return
+
+    def run(language):
+        language_started = time.monotonic()
+        result = translate_document(text, language)
+        result["seconds"] = round(time.monotonic() - language_started, 3)
+        return result
+
+    with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="fanout") as executor:
+        futures = {executor.submit(run, language): language for language in pending}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                message, status = _describe_error(e)
+                yield futures[future], {"error": message, "status": status}
+
+
+class UploadSession:
+    """
+    Tracks the segments of one streamed recording. Each segment is a future
+    on `segment_executor`, keyed by the sequence number the client sent.
+    A segment whose transcription failed can be uploaded again under the
+    same sequence number; it never blocks the other segments.
+    """
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.segments = {}
+        self.lock = threading.Lock()
+        self.touched = time.monotonic()
+
+    def submit(self, seq: int, audio: bytes, filename: str):
+        with self.lock:
+            previous = self.segments.get(seq)
+            if previous is not None and not (previous.done() and previous.exception()):
+                raise ValueError(f"Segment {seq} was already uploaded")
+            self.segments[seq] = segment_executor.submit(
+                medical_transcription, audio, filename
+            )
+            self.touched = time.monotonic()
+
+    def statuses(self) -> list:
+        """
+        Returns one entry per uploaded segment, in sequence order, with its
+        status ("done", "failed" or "pending") and the transcript or error.
+        """
+        with self.lock:
+            segments = dict(self.segments)
+        statuses = []
+        for seq in sorted(segments):
+            future = segments[seq]
+            if not future.done():
+                statuses.append({"seq": seq, "status": "pending"})
+            elif future.exception() is not None:
+                message, status = _describe_error(future.exception())
+                statuses.append({"seq": seq, "status": "failed",
+                                 "error": message, "errorStatus": status})
+            else:
+                statuses.append({"seq": seq, "status": "done",
+                                 "transcript": future.result()})
+        return statuses
+
+    def ready_transcripts(self) -> list:
+        """
+        Returns the transcripts of the contiguous run of finished segments
+        starting at sequence 0, so partial text is always in recording order.
+        Stops at the first pending, failed or missing segment.
+        """
+        transcripts = []
+        for expected, segment in enumerate(self.statuses()):
+            if segment["seq"] != expected or segment["status"] != "done":
+                break
+            transcripts.append(segment["transcript"])
+        return transcripts
+
+    def wait_all(self) -> list:
+        """Waits for every segment and returns their statuses."""
+        with self.lock:
+            segments = list(self.segments.values())
+        wait(segments)
+        return self.statuses()
+
+
+def _get_upload_session(session_id: str):
+    with upload_sessions_lock:
+        now = time.monotonic()
+        for sid in [sid for sid, s in upload_sessions.items()
+                    if now - s.touched > UPLOAD_SESSION_TTL]:
+            del upload_sessions[sid]
+        if not session_id:
+            session = UploadSession()
+            upload_sessions[session.id] = session
+            return session
+        return upload_sessions.get(session_id)
+
+
+_owner = (None, None)
+
+
+def _process_owner() -> str:
+    """
+    Identifies this process as a job owner: its pid plus a token drawn once
+    per process, so a restarted worker that reuses a pid does not adopt its
+    predecessor's jobs.
+    """
+    global _owner
+    if _owner[0] != os.getpid():
+        _owner = (os.getpid(), f"{os.getpid()}:{uuid.uuid4().hex}")
+    return _owner[1]
+
+
+class JobQueue:
+    """
+    Runs transcription jobs on a worker pool. Job state and transcripts live
+    in an SQLite store: a file shared by every worker process on the host
+    when JOB_STORE_PATH is set, otherwise an in-memory database private to
+    this process. Audio stays in the memory of the process that received it
+    until its job has run; JOB_MAX_QUEUE bounds the jobs waiting and
+    JOB_MAX_QUEUE_BYTES the audio held. Submissions are keyed by a SHA-256 of the
+    audio so duplicates share one job. Each row records the process that
+    owns it; unfinished jobs whose process has gone are marked failed rather
+    than shared with duplicates. Finished jobs are kept for
+    JOB_RESULT_TTL seconds. Wait and run times are kept for capacity
+    planning.
+    """
+
+    COLUMNS = ("id", "audio_hash", "status", "transcript", "error", "error_status",
+               "submitted", "started", "finished", "owner")
+
+    def __init__(self, workers: int, max_queue: int, max_queue_bytes: int, path: str):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_queue_bytes = max_queue_bytes
+        self.path = path
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.db = None
+        self.pid = None
+        self.audio_bytes = 0
+        self.wait_times = deque(maxlen=1000)
+        self.run_times = deque(maxlen=1000)
+        self.counters = {"submitted": 0, "deduplicated": 0, "completed": 0,
+                         "failed": 0, "rejected": 0}
+
+    def _store(self):
+        # Caller holds self.lock. One connection per process, opened lazily
+        # so forked workers do not share the parent's.
+        if self.db is None or self.pid != os.getpid():
+            if self.path:
+                db = _open_private_db(self.path, check_same_thread=False)
+            else:
+                db = sqlite3.connect(":memory:", check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, "
+                "audio_hash TEXT NOT NULL, status TEXT NOT NULL, transcript TEXT, "
+                "error TEXT, error_status INTEGER, submitted REAL NOT NULL, "
+                "started REAL, finished REAL, owner TEXT NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_audio_hash ON jobs (audio_hash)")
+            self.db, self.pid = db, os.getpid()
+        return self.db
+
+    @staticmethod
+    def _owner_alive(owner: str) -> bool:
+        pid, _, token = owner.partition(":")
+        if int(pid) == os.getpid():
+            return owner == _process_owner()
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _fail_orphans(self, db):
+        # Caller holds self.lock. Jobs only run in the process that accepted
+        # them; if it has gone, its unfinished jobs never will.
+        orphans = [(job_id,) for job_id, owner in db.execute(
+            "SELECT id, owner FROM jobs WHERE status IN ('queued', 'running')"
+        ).fetchall() if not self._owner_alive(owner)]
+        if orphans:
+            db.executemany(
+                "UPDATE jobs SET status = 'failed', error_status = 500, finished = ?, "
+                "error = 'Job was lost when its server process stopped' WHERE id = ?",
+                [(time.time(), job_id) for job_id, in orphans],
+            )
+
+    def _row(self, db, where: str, params) -> dict:
+        row = db.execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE {where}", params
+        ).fetchone()
+        return dict(zip(self.COLUMNS, row)) if row else None
+
+    def _update(self, job_id: str, **fields):
+        with self.changed:
+            db = self._store()
+            with db:
+                db.execute(
+                    f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                    list(fields.values()) + [job_id],
+                )
+            self.changed.notify_all()
+
+    def submit(self, audio: bytes, filename: str):
+        """
+        Returns (job, deduplicated). Raises JobQueueFullError when
+        JOB_MAX_QUEUE jobs are already waiting, or when the audio would take
+        this process past JOB_MAX_QUEUE_BYTES of queued and running audio.
+        """
+        audio_hash = hashlib.sha256(audio).hexdigest()
+        now = time.time()
+        with self.lock:
+            db = self._store()
+            with db:
+                db.execute("BEGIN IMMEDIATE")
+                db.execute("DELETE FROM jobs WHERE finished < ?", (now - JOB_RESULT_TTL,))
+                self._fail_orphans(db)
+                existing = self._row(
+                    db, "audio_hash = ? AND status != 'failed' "
+                    "ORDER BY submitted DESC LIMIT 1", (audio_hash,),
+                )
+                if existing is not None:
+                    self.counters["deduplicated"] += 1
+                    return _job_dict(existing), True
+                queued = db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued'"
+                ).fetchone()[0]
+                if (queued >= self.max_queue
+                        or self.audio_bytes + len(audio) > self.max_queue_bytes):
+                    self.counters["rejected"] += 1
+                    raise JobQueueFullError("Job queue is full, please retry shortly")
+                job = {"id": uuid.uuid4().hex, "audio_hash": audio_hash,
+                       "status": "queued", "submitted": now}
+                db.execute(
+                    "INSERT INTO jobs (id, audio_hash, status, submitted, owner) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (job["id"], audio_hash, "queued", now, _process_owner()),
+                )
+            self.audio_bytes += len(audio)
+            self.counters["submitted"] += 1
+        self.executor.submit(self._run, job["id"], audio, filename, now)
+        return _job_dict(job), False
+
+    def _run(self, job_id: str, audio: bytes, filename: str, submitted: float):
+        started = time.time()
+        try:
+            self._update(job_id, status="running", started=started)
+            transcript = medical_transcription(audio, filename)
+        except Exception as e:
+            message, status = _describe_error(e)
+            fields = dict(status="failed", error=message, error_status=status)
+            outcome = "failed"
+        else:
+            fields = dict(status="done", transcript=transcript)
+            outcome = "completed"
+        finished = time.time()
+        try:
+            self._update(job_id, finished=finished, **fields)
+        except sqlite3.Error as e:
+            app.logger.warning("Job store write failed: %s", e)
+        with self.lock:
+            self.audio_bytes -= len(audio)
+            self.counters[outcome] += 1
+            self.wait_times.append(started - submitted)
+            self.run_times.append(finished - started)
+        metrics.observe("app_job_wait_seconds", started - submitted)
+        metrics.observe("app_job_run_seconds", finished - started)
+
+    def get(self, job_id: str):
+        """Returns the job's status dict, or None if it is unknown or expired."""
+        where = "id = ? AND (finished IS NULL OR finished >= ?)"
+        with self.lock:
+            db = self._store()
+            row = self._row(db, where, (job_id, time.time() - JOB_RESULT_TTL))
+            if row and row["finished"] is None and not self._owner_alive(row["owner"]):
+                with db:
+                    self._fail_orphans(db)
+                row = self._row(db, where, (job_id, time.time() - JOB_RESULT_TTL))
+        return _job_dict(row) if row else None
+
+    def wait_for_change(self, job_id: str, status: str, timeout: float):
+        """
+        Waits up to `timeout` seconds for the job to leave `status` and
+        returns its latest status dict. Jobs run by this process wake the
+        caller at once; jobs run by another process are polled.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] != status or remaining <= 0:
+                return job
+            with self.changed:
+                self.changed.wait(min(remaining, 1.0))
+
+    @staticmethod
+    def _summary(samples) -> dict:
+        if not samples:
+            return {"mean": 0.0, "p95": 0.0, "max": 0.0}
+        ordered = sorted(samples)
+        return {
+            "mean": round(sum(ordered) / len(ordered), 3),
+            "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+            "max": round(ordered[-1], 3),
+        }
+
+    def stats(self) -> dict:
+        with self.lock:
+            counts = dict(self._store().execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall())
+            return dict(
+                self.counters,
+                queueDepth=counts.get("queued", 0),
+                running=counts.get("running", 0),
+                audioBytes=self.audio_bytes,
+                workers=self.workers,
+                maxQueue=self.max_queue,
+                maxQueueBytes=self.max_queue_bytes,
+                shared=bool(self.path),
+                waitSeconds=self._summary(self.wait_times),
+                runSeconds=self._summary(self.run_times),
+            )
+
+
+def _job_dict(job: dict) -> dict:
+    """Shapes a job row as the JSON returned by the /jobs endpoints."""
+    data = {"jobId": job["id"], "status": job["status"]}
+    if job.get("started") is not None:
+        data["waitSeconds"] = round(job["started"] - job["submitted"], 3)
+    if job.get("finished") is not None and job.get("started") is not None:
+        data["runSeconds"] = round(job["finished"] - job["started"], 3)
+    if job["status"] == "done":
+        data["transcript"] = job["transcript"]
+    elif job["status"] == "failed":
+        data["error"] = job["error"]
+        data["errorStatus"] = job["error_status"]
+    return data
+
+
+class JobQueueFullError(UpstreamBusyError):
+    """
+    Raised when a job is submitted while the job queue is full.
+    """
+
+
+job_queue = JobQueue(JOB_WORKERS, JOB_MAX_QUEUE, JOB_MAX_QUEUE_BYTES, JOB_STORE_PATH)
+
+
+def _wants_event_stream() -> bool:
+    """
+    True when the client asked for Server-Sent Events, either through the
+    Accept header or with ?stream=1.
+    """
+    if request.args.get("stream") == "1":
+        return True
+    best = request.accept_mimetypes.best_match(["application/json", "text/event-stream"])
+    return best == "text/event-stream"
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _event_stream(deltas, done_key: str):
+    """
+    Wraps a generator of text deltas as an SSE response: one `delta` event
+    per chunk, then a `done` event carrying the full text under `done_key`,
+    or an `error` event if the upstream call fails part-way.
+    """
+    def generate():
+        parts = []
+        try:
+            for delta in deltas:
+                parts.append(delta)
+                yield _sse("delta", {"text": delta})
+        except Exception as e:
+            message, status = _describe_error(e)
+            yield _sse("error", {"error": message, "status": status})
+            return
+        finally:
+            if hasattr(deltas, "close"):
+                deltas.close()
+        yield _sse("done", {done_key: "".join(parts).strip()})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _fanout_event_stream(results):
+    """
+    Streams translate_fanout results as SSE: a `translation` event per
+    language that succeeded, an `error` event per language that failed (both
+    carrying `language`), then a `done` event with every result.
+    """
+    def generate():
+        translations = {}
+        for language, result in results:
+            translations[language] = result
+            event = "error" if "error" in result else "translation"
+            yield _sse(event, dict(result, language=language))
+        yield _sse("done", {"translations": translations})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _join_segments(transcripts: list) -> str:
+    return " ".join(t for t in transcripts if t)
+
 
 @app.route('/')
 def index():
-    return render_template("index.html")
+    return render_template(
+        "index.html", segment_seconds=SEGMENT_SECONDS if SEGMENTED_UPLOADS else 0
+    )
 
 @app.route('/upload', methods=["POST"])
 def upload():
     """
-    Receives the recorded audio file from the front end, saves it temporarily,
-    transcribes and refines it, and returns the refined transcript as JSON.
+    Receives the recorded audio file from the front end, streams it straight
+    to the transcription API, and returns the refined transcript as JSON.
+    Clients that accept text/event-stream get the refinement streamed as
+    Server-Sent Events instead.
     """
     if "audio_data" not in request.files:
         return jsonify({"error": "No audio file provided"}), 400
 
     audio_file = request.files["audio_data"]
-    fd, temp_path = tempfile.mkstemp(suffix=".webm")
+    filename = audio_file.filename or "recording.webm"
     try:
-        with os.fdopen(fd, 'wb') as f:
-            f.write(audio_file.read())
-        transcript = medical_transcription(temp_path)
+        if _wants_event_stream():
+            raw_transcript = transcribe_audio(audio_file.stream, filename)
+            return _event_stream(stream_refined_transcript(raw_transcript), "transcript")
+        transcript = medical_transcription(audio_file.stream, filename)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        try:
-            import time
-            time.sleep(0.1)
-            os.remove(temp_path)
-        except Exception as remove_error:
-            print("Error removing temporary file:", remove_error)
+        return _error_response(e)
     return jsonify({"transcript": transcript})
 
+def _segment_report(session: UploadSession, statuses: list) -> dict:
+    """
+    Summarises a session for the client: the in-order transcripts finished
+    so far, the status of every segment, and the sequence numbers that
+    failed or were never received and so must be uploaded again.
+    """
+    seqs = {s["seq"] for s in statuses}
+    return {
+        "sessionId": session.id,
+        "segments": [{k: v for k, v in s.items() if k != "transcript"} for s in statuses],
+        "pending": sum(1 for s in statuses if s["status"] == "pending"),
+        "failed": [s["seq"] for s in statuses if s["status"] == "failed"],
+        "missing": [seq for seq in range(max(seqs, default=-1) + 1) if seq not in seqs],
+    }
+
+@app.route('/upload/segments', methods=["POST"])
+def upload_segment():
+    """
+    Receives one segment of a recording in progress. The first segment
+    (seq 0) is sent without a sessionId and opens a new session. Returns the
+    transcripts of all segments finished so far, in recording order, and
+    the status of every segment. A failed segment may be sent again with
+    the same seq.
+    """
+    if "audio_data" not in request.files:
+        return jsonify({"error": "No audio file provided"}), 400
+    try:
+        seq = int(request.form.get("seq", ""))
+    except ValueError:
+        return jsonify({"error": "Missing or invalid segment number"}), 400
+
+    session = _get_upload_session(request.form.get("sessionId", ""))
+    if session is None:
+        return jsonify({"error": "Unknown or expired upload session"}), 404
+
+    audio_file = request.files["audio_data"]
+    try:
+        with stage_timer("upload_read"):
+            audio = audio_file.read()
+        session.submit(seq, audio, audio_file.filename or f"segment-{seq}.webm")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        return _error_response(e)
+    report = _segment_report(session, session.statuses())
+    report["transcripts"] = session.ready_transcripts()
+    return jsonify(report)
+
+@app.route('/upload/segments/<session_id>/finish', methods=["POST"])
+def finish_upload(session_id):
+    """
+    Waits for every segment of the session to be transcribed and returns the
+    full transcript in the same shape as /upload. The session is closed only
+    when every segment succeeded; otherwise the transcript of the segments
+    that did succeed is returned with `complete: false` and the failed or
+    missing seqs, and the session stays open so they can be sent again.
+    """
+    with upload_sessions_lock:
+        session = upload_sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired upload session"}), 404
+    statuses = session.wait_all()
+    report = _segment_report(session, statuses)
+    report["transcript"] = _join_segments(
+        [s["transcript"] for s in statuses if s["status"] == "done"]
+    )
+    report["complete"] = not report["failed"] and not report["missing"]
+    if report["complete"]:
+        with upload_sessions_lock:
+            upload_sessions.pop(session_id, None)
+    return jsonify(report)
+
 @app.route('/translate', methods=["POST"])
 def translate():
     """
     Receives a JSON payload containing the transcript and target language,
-    translates the transcript, and returns the translated text.
+    translates the transcript, and returns the translated text. Clients that
+    accept text/event-stream get the translation streamed as Server-Sent
+    Events instead.
+
+    A `targetLanguages` list may be sent instead of `targetLanguage`; the
+    reply then maps each language to its own result or error.
     """
     data = request.get_json()
     text = data.get("text", "")
+    target_languages = data.get("targetLanguages")
+    if target_languages is not None:
+        if (not isinstance(target_languages, list) or not target_languages
+                or not all(isinstance(l, str) and l.strip() for l in target_languages)):
+            return jsonify({"error": "targetLanguages must be a list of language names"}), 400
+        target_languages = list(dict.fromkeys(l.strip() for l in target_languages))
+        if len(target_languages) > TRANSLATION_MAX_LANGUAGES:
+            return jsonify({
+                "error": f"At most {TRANSLATION_MAX_LANGUAGES} target languages are allowed"
+            }), 400
+        if not text:
+            return jsonify({"error": "Missing text or target language"}), 400
+        results = translate_fanout(text, target_languages)
+        if _wants_event_stream():
+            return _fanout_event_stream(results)
+        translations = dict(results)
+        statuses = [r["status"] for r in translations.values() if "error" in r]
+        status = statuses[0] if len(statuses) == len(translations) else 200
+        return jsonify({"translations": translations}), status
+
     target_language = data.get("targetLanguage", "")
     if not text or not target_language:
         return jsonify({"error": "Missing text or target language"}), 400
     try:
-        translated_text = translate_text(text, target_language)
+        if _wants_event_stream():
+            return _event_stream(stream_translation(text, target_language), "translatedText")
+        result = translate_document(text, target_language)
+    except Exception as e:
+        return _error_response(e)
+    return jsonify(result)
+
+@app.route('/jobs', methods=["POST"])
+def create_job():
+    """
+    Queues a recording for background transcription and refinement and
+    returns its job id straight away. Audio identical to a queued, running
+    or recently finished job returns that job instead.
+    """
+    if "audio_data" not in request.files:
+        return jsonify({"error": "No audio file provided"}), 400
+
+    audio_file = request.files["audio_data"]
+    try:
+        with stage_timer("upload_read"):
+            audio = audio_file.read()
+        job, deduplicated = job_queue.submit(audio, audio_file.filename or "recording.webm")
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    return jsonify({"translatedText": translated_text})
+        return _error_response(e)
+    response = jsonify(dict(job, deduplicated=deduplicated))
+    response.headers["Location"] = f"/jobs/{job['jobId']}"
+    return response, 202
+
+@app.route('/jobs/<job_id>', methods=["GET"])
+def get_job(job_id):
+    """
+    Returns a job's status, and its transcript or error once it has finished.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/events', methods=["GET"])
+def job_events(job_id):
+    """
+    Streams a job's progress as Server-Sent Events: a `status` event for
+    every change, then `done` with the transcript or `error`.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+
+    def generate():
+        data, status = job, None
+        while True:
+            if data is None:
+                yield _sse("error", {"error": "Unknown or expired job", "status": 404})
+                return
+            if data["status"] == "done":
+                yield _sse("done", data)
+                return
+            if data["status"] == "failed":
+                yield _sse("error", data)
+                return
+            if data["status"] != status:
+                status = data["status"]
+                yield _sse("status", data)
+            data = job_queue.wait_for_change(job_id, status, timeout=15)
+            if data is not None and data["status"] == status:
+                yield ": keep-alive\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.route('/stats', methods=["GET"])
+def stats():
+    """
+    Returns runtime counters used for capacity planning and cache sizing.
+    """
+    return jsonify({
+        "upstream": upstream.stats(),
+        "refinement": refinement_stats(),
+        "jobs": job_queue.stats(),
+        "translationCache": translation_cache.stats(),
+        "translationBatching": translation_coalescer.stats(),
+    })
+
+@app.route('/metrics', methods=["GET"])
+def metrics_endpoint():
+    """
+    Exposes per-stage latency histograms, in-flight gauges and upstream
+    error counts in the Prometheus text format.
+    """
+    upstream_stats = upstream.stats()
+    job_stats = job_queue.stats()
+    body = metrics.render(extra_gauges=[
+        ("app_upstream_in_flight", {}, upstream_stats["inFlight"]),
+        ("app_upstream_queued", {}, upstream_stats["queued"]),
+        ("app_jobs_queued", {}, job_stats["queueDepth"]),
+        ("app_jobs_running", {}, job_stats["running"]),
+    ])
+    return Response(body, mimetype="text/plain; version=0.0.4")
 
 if __name__ == '__main__':
     app.run()
@@ -0,0 +1,353 @@
+"""
+Load test for the Flask app against the local OpenAI stand-in.
+
+Starts benchmarks/mock_openai.py in-process, launches the app (Flask's
+threaded dev server, or gunicorn with the given workers and threads) pointed
+at it, drives concurrent traffic, and reports p50/p95/p99 latency and
+throughput per scenario, plus the app's own stage timings from /metrics.
+No network access is needed.
+
+Scenarios: whole-recording uploads, segmented uploads (segments then
+/finish), background jobs followed over their event feed, plain and
+streamed single-language translations, and streamed multi-language
+translations. Streamed scenarios also report the time to the first event.
+
+    python benchmarks/load_test.py --scenario mixed --concurrency 16 --requests 400
+    python benchmarks/load_test.py --scenario translate-stream --requests 100
+    python benchmarks/load_test.py --server gunicorn --workers 2 --threads 16 --json run.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mock_openai import add_mock_arguments, settings_from_args, start_mock_server  # noqa: E402
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PHRASES = [
+    "Take one tablet by mouth twice a day with food.",
+    "Do not drive after taking this medication.",
+    "Return to the emergency department if the chest pain comes back.",
+    "Keep the wound clean and dry for forty-eight hours.",
+    "Your blood pressure is higher than we would like.",
+    "We will check your kidney function with a blood test.",
+    "Stop taking ibuprofen while you are on warfarin.",
+    "Drink plenty of fluids and rest for the next few days.",
+]
+LANGUAGES = ["Spanish", "French", "Chinese", "Arabic", "Hindi"]
+SCENARIOS = ["upload", "segments", "jobs", "translate", "translate-stream", "fanout"]
+DEFAULT_MIX = "upload=2,segments=1,jobs=1,translate=4,translate-stream=1,fanout=1"
+
+
+def _parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name.strip()!r}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _request(url: str, body: bytes = None, content_type: str = None, timeout: float = 120):
+    req = urllib.request.Request(url, data=body, method="POST" if body is not None else "GET")
+    if content_type:
+        req.add_header("Content-Type", content_type)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except (urllib.error.URLError, OSError) as e:
+        return 0, str(e).encode()
+
+
+def _event_stream(url: str, body: bytes = None, content_type: str = None,
+                  timeout: float = 120):
+    """
+    Reads a Server-Sent Events reply to the end. Returns (status, seconds
+    until the first event after the request was sent, or None). An `error`
+    event counts as its own status.
+    """
+    req = urllib.request.Request(url, data=body, method="POST" if body is not None else "GET")
+    req.add_header("Accept", "text/event-stream")
+    if content_type:
+        req.add_header("Content-Type", content_type)
+    started, first, event = time.perf_counter(), None, None
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            status = response.status
+            for line in response:
+                line = line.decode("utf-8").rstrip("\r\n")
+                if line.startswith("event: "):
+                    event = line[7:]
+                    if first is None:
+                        first = time.perf_counter() - started
+                elif line.startswith("data: ") and event == "error":
+                    status = json.loads(line[6:]).get("status") or 500
+    except urllib.error.HTTPError as e:
+        return e.code, None
+    except (urllib.error.URLError, OSError):
+        return 0, None
+    return status, first
+
+
+def _multipart(field: str, filename: str, data: bytes, fields: dict = None):
+    boundary = uuid.uuid4().hex
+    body = b"".join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in (fields or {}).items()
+    ) + (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        "Content-Type: audio/webm\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def start_app(args, openai_base_url: str):
+    """
+    Launches the app in a subprocess and waits until it answers. Returns
+    (process, base url).
+    """
+    port = _free_port()
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="load-test",
+        OPENAI_BASE_URL=openai_base_url,
+        TRANSLATION_CACHE_PATH=os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+        if args.disk_cache else "",
+        # Lets any gunicorn worker answer for a job another one accepted.
+        JOB_STORE_PATH=os.path.join(tempfile.mkdtemp(), "jobs.sqlite3")
+        if args.server == "gunicorn" and args.workers > 1 else "",
+    )
+    if args.server == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "app:app",
+                   "--worker-class", "gthread", "--workers", str(args.workers),
+                   "--threads", str(args.threads), "--bind", f"127.0.0.1:{port}"]
+    else:
+        command = [sys.executable, "-m", "flask", "--app", "app", "run",
+                   "--port", str(port), "--with-threads"]
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("App exited during start-up:\n" + process.stderr.read().decode())
+        if _request(base_url + "/stats", timeout=2)[0] == 200:
+            return process, base_url
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("App did not start within 30 seconds")
+
+
+def _upload_segments(base_url: str, segments: list):
+    session_id, status = "", 0
+    for seq, audio in enumerate(segments):
+        body, content_type = _multipart("audio_data", f"segment-{seq}.webm", audio, {
+            "seq": str(seq), "sessionId": session_id,
+        })
+        status, reply = _request(base_url + "/upload/segments", body, content_type)
+        if status != 200:
+            return status, None
+        session_id = json.loads(reply)["sessionId"]
+    status, reply = _request(f"{base_url}/upload/segments/{session_id}/finish", b"")
+    if status == 200 and not json.loads(reply)["complete"]:
+        status = 500
+    return status, None
+
+
+def _run_job(base_url: str, audio: bytes):
+    body, content_type = _multipart("audio_data", "recording.webm", audio)
+    status, reply = _request(base_url + "/jobs", body, content_type)
+    if status != 202:
+        return status, None
+    return _event_stream(f"{base_url}/jobs/{json.loads(reply)['jobId']}/events")
+
+
+def _translation_text(args, rng: random.Random) -> str:
+    sentences = rng.sample(PHRASES, rng.randint(1, 3))
+    if rng.random() >= args.repeat_ratio:
+        sentences.append(f"Reference number {rng.getrandbits(32):08x}.")
+    return " ".join(sentences)
+
+
+def make_operation(args, base_url: str, rng: random.Random):
+    """
+    Returns a (name, callable) pair for one operation of the chosen
+    scenario. The callable returns (status, seconds to first event or None).
+    Payloads come from `rng`, so a seed always produces the same traffic.
+    """
+    name = args.scenario
+    if name == "mixed":
+        names, weights = zip(*args.mix.items())
+        name = rng.choices(names, weights)[0]
+
+    if name == "upload":
+        body, content_type = _multipart("audio_data", "recording.webm",
+                                        rng.randbytes(args.audio_kb * 1024))
+        return name, lambda: (_request(base_url + "/upload", body, content_type)[0], None)
+    if name == "segments":
+        size = max(1, args.audio_kb * 1024 // args.segments)
+        segments = [rng.randbytes(size) for _ in range(args.segments)]
+        return name, lambda: _upload_segments(base_url, segments)
+    if name == "jobs":
+        audio = rng.randbytes(args.audio_kb * 1024)
+        return name, lambda: _run_job(base_url, audio)
+
+    text = _translation_text(args, rng)
+    if name == "fanout":
+        languages = rng.sample(LANGUAGES, rng.randint(2, len(LANGUAGES)))
+        body = json.dumps({"text": text, "targetLanguages": languages}).encode()
+        return name, lambda: _event_stream(base_url + "/translate", body, "application/json")
+    body = json.dumps({"text": text, "targetLanguage": rng.choice(LANGUAGES)}).encode()
+    if name == "translate-stream":
+        return name, lambda: _event_stream(base_url + "/translate", body, "application/json")
+    return name, lambda: (_request(base_url + "/translate", body, "application/json")[0], None)
+
+
+def percentile(ordered: list, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def run_load(args, base_url: str) -> dict:
+    rng = random.Random(args.seed)
+    operations = [make_operation(args, base_url, rng) for _ in range(args.warmup + args.requests)]
+
+    def timed(operation):
+        name, call = operation
+        started = time.perf_counter()
+        status, first = call()
+        return name, status, time.perf_counter() - started, first
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(timed, operations[:args.warmup]))
+        started = time.perf_counter()
+        samples = list(executor.map(timed, operations[args.warmup:]))
+        elapsed = time.perf_counter() - started
+
+    results = {}
+    for name in sorted({s[0] for s in samples} | {"all"}):
+        selected = [s for s in samples if name == "all" or s[0] == name]
+        latencies = sorted(s[2] for s in selected)
+        statuses = {}
+        for s in selected:
+            statuses[str(s[1])] = statuses.get(str(s[1]), 0) + 1
+        results[name] = {
+            "requests": len(selected),
+            "errors": sum(1 for s in selected if not 200 <= s[1] < 300),
+            "statuses": statuses,
+            "throughput": round(len(selected) / elapsed, 2),
+            "mean": round(sum(latencies) / len(latencies), 4),
+            "p50": round(percentile(latencies, 0.50), 4),
+            "p95": round(percentile(latencies, 0.95), 4),
+            "p99": round(percentile(latencies, 0.99), 4),
+            "max": round(latencies[-1], 4),
+        }
+        firsts = sorted(s[3] for s in selected if s[3] is not None)
+        if firsts and name != "all":
+            results[name]["firstEvent"] = {
+                "p50": round(percentile(firsts, 0.50), 4),
+                "p95": round(percentile(firsts, 0.95), 4),
+            }
+    return {"elapsedSeconds": round(elapsed, 3), "endpoints": results}
+
+
+def scrape_stage_means(base_url: str) -> dict:
+    """
+    Returns {metric{labels}: (count, mean seconds)} for the stage and
+    upstream histograms of whichever worker answers the scrape.
+    """
+    status, body = _request(base_url + "/metrics")
+    if status != 200:
+        return {}
+    sums, counts = {}, {}
+    for line in body.decode().splitlines():
+        match = re.match(r"(app_(?:stage|upstream_request)_seconds)_(sum|count)(\{.*\})? (\S+)", line)
+        if match:
+            key = match.group(1) + (match.group(3) or "")
+            (sums if match.group(2) == "sum" else counts)[key] = float(match.group(4))
+    return {key: (int(counts[key]), round(sums[key] / counts[key], 4))
+            for key in sorted(counts) if counts[key]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenario", choices=SCENARIOS + ["mixed"], default="mixed")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix(DEFAULT_MIX),
+                        help="relative weights of the scenarios in the mixed scenario "
+                             f"(default: {DEFAULT_MIX})")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests (default: 200)")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured warm-up requests (default: 10)")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients (default: 8)")
+    parser.add_argument("--repeat-ratio", type=float, default=0.3,
+                        help="share of translations made only of stock phrases, "
+                             "which the translation cache can serve (default: 0.3)")
+    parser.add_argument("--audio-kb", type=int, default=64, help="upload size in KiB (default: 64)")
+    parser.add_argument("--segments", type=int, default=3,
+                        help="segments per recording in the segments scenario (default: 3); "
+                             "needs a single server process")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--server", choices=["flask", "gunicorn"], default="flask")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers (default: 2)")
+    parser.add_argument("--threads", type=int, default=16, help="gunicorn threads per worker (default: 16)")
+    parser.add_argument("--disk-cache", action="store_true",
+                        help="enable the SQLite translation cache tier (off by default)")
+    parser.add_argument("--target", help="benchmark an already running app at this URL instead")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    process = None
+    if args.target:
+        base_url = args.target.rstrip("/")
+    else:
+        mock = start_mock_server(settings_from_args(args))
+        process, base_url = start_app(args, f"http://127.0.0.1:{mock.server_address[1]}/v1")
+    try:
+        report = run_load(args, base_url)
+        report["stages"] = scrape_stage_means(base_url)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+    report["settings"] = {k: v for k, v in vars(args).items() if k != "json_path"}
+
+    print(f"{'scenario':<17} {'requests':>8} {'errors':>6} {'req/s':>8} "
+          f"{'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'first p50':>10}")
+    for name, r in report["endpoints"].items():
+        first = f"{r['firstEvent']['p50']:>10.3f}" if "firstEvent" in r else f"{'-':>10}"
+        print(f"{name:<17} {r['requests']:>8} {r['errors']:>6} {r['throughput']:>8.2f} "
+              f"{r['p50']:>8.3f} {r['p95']:>8.3f} {r['p99']:>8.3f} {r['max']:>8.3f} {first}")
+    if report["stages"]:
+        print("\nStage timings reported by the app (one worker):")
+        for key, (count, mean) in report["stages"].items():
+            print(f"  {key:<60} n={count:<6} mean={mean:.4f}s")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
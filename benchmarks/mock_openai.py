@@ -0,0 +1,181 @@
+"""
+Local stand-in for the OpenAI endpoints used by app.py, for benchmarks and
+offline runs. It answers transcription and chat completion requests
+(plain, JSON-mode and streamed) with deterministic text after a configurable
+delay, and can inject failures.
+
+Run it on its own and point the app at it:
+
+    python benchmarks/mock_openai.py --port 8900 --latency 300 --jitter 100
+    OPENAI_API_KEY=test OPENAI_BASE_URL=http://127.0.0.1:8900/v1 flask run
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRANSCRIPT = (
+    "The patient reports chest pain since yesterday and has a history of "
+    "high per tension. She takes lisinoprel and metformin every morning. "
+    "Blood pressure today is one forty over ninety. Follow up in two weeks."
+)
+
+
+class MockSettings:
+    """
+    Behaviour of the mock server. Latencies are in milliseconds; each
+    request waits latency_ms plus or minus up to jitter_ms, and fails with
+    failure_status with probability failure_rate.
+    """
+
+    def __init__(self, latency_ms=200.0, jitter_ms=50.0, failure_rate=0.0,
+                 failure_status=500, stream_interval_ms=20.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.stream_interval_ms = stream_interval_ms
+
+
+def _chat_reply(payload: dict) -> str:
+    messages = payload.get("messages", [])
+    system = next((m["content"] for m in messages if m["role"] == "system"), "")
+    user = messages[-1]["content"] if messages else ""
+
+    if payload.get("response_format", {}).get("type") == "json_object":
+        items = json.loads(user)
+        if '"sentences"' in system:
+            return json.dumps({"sentences": items})
+        languages = re.search(r"languages: (.+?)\. Reply", system)
+        if languages:
+            names = languages.group(1).split(", ")
+            return json.dumps({name: [f"[{name}] {item}" for item in items] for name in names})
+        language = re.search(r"into (.+?)\. Reply", system)
+        name = language.group(1) if language else "translation"
+        return json.dumps({"translations": [f"[{name}] {item}" for item in items]})
+
+    language = re.search(r"into (.+?):", system)
+    if language:
+        return f"[{language.group(1)}] {user}"
+    # Refinement prompt: echo the transcript that follows the instructions.
+    return user.split("\n\n", 1)[-1]
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    server_version = "MockOpenAI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        settings = self.server.settings
+        delay = settings.latency_ms + random.uniform(-settings.jitter_ms, settings.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000)
+
+        with self.server.counts_lock:
+            self.server.request_counts[self.path] = self.server.request_counts.get(self.path, 0) + 1
+
+        if random.random() < settings.failure_rate:
+            self._send_json(settings.failure_status, {"error": {
+                "message": "Injected failure", "type": "server_error", "code": None,
+            }})
+            return
+        if self.path.endswith("/audio/transcriptions"):
+            self._send_json(200, {"text": TRANSCRIPT})
+            return
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"No mock for {self.path}"}})
+            return
+
+        payload = json.loads(body)
+        content = _chat_reply(payload)
+        created = int(time.time())
+        if not payload.get("stream"):
+            self._send_json(200, {
+                "id": "chatcmpl-mock", "object": "chat.completion", "created": created,
+                "model": payload.get("model", "mock"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for word in re.findall(r"\S+\s*", content):
+            chunk = {
+                "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created,
+                "model": payload.get("model", "mock"),
+                "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(settings.stream_interval_ms / 1000)
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+def start_mock_server(settings: MockSettings, host: str = "127.0.0.1", port: int = 0):
+    """
+    Starts the mock server on a background thread and returns it. Use
+    port 0 to pick a free port; the chosen one is server.server_address[1].
+    server.request_counts maps each request path to the requests received.
+    """
+    server = ThreadingHTTPServer((host, port), MockOpenAIHandler)
+    server.daemon_threads = True
+    server.settings = settings
+    server.request_counts = {}
+    server.counts_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, name="mock-openai", daemon=True).start()
+    return server
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", type=float, default=200.0,
+                        help="mean upstream latency in ms (default: 200)")
+    parser.add_argument("--jitter", type=float, default=50.0,
+                        help="uniform latency jitter in ms (default: 50)")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="fraction of upstream requests that fail (default: 0)")
+    parser.add_argument("--failure-status", type=int, default=500,
+                        help="HTTP status of injected failures, e.g. 429 or 500 (default: 500)")
+    parser.add_argument("--stream-interval", type=float, default=20.0,
+                        help="delay between streamed tokens in ms (default: 20)")
+
+
+def settings_from_args(args) -> MockSettings:
+    return MockSettings(args.latency, args.jitter, args.failure_rate,
+                        args.failure_status, args.stream_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    server = start_mock_server(settings_from_args(args), args.host, args.port)
+    print(f"Mock OpenAI listening on http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
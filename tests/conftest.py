@@ -0,0 +1,32 @@
+"""
+Shared setup for the test suite. The app is imported against the local mock
+OpenAI server from benchmarks/, so no network access or API key is needed.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+from mock_openai import MockSettings, start_mock_server  # noqa: E402
+
+mock_server = start_mock_server(MockSettings(latency_ms=5, jitter_ms=0, stream_interval_ms=0))
+os.environ["OPENAI_API_KEY"] = "test"
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{mock_server.server_address[1]}/v1"
+os.environ["TRANSLATION_CACHE_PATH"] = ""
+
+
+@pytest.fixture
+def mock_openai():
+    """The running mock server; its settings are restored after each test."""
+    settings = vars(mock_server.settings).copy()
+    yield mock_server
+    vars(mock_server.settings).update(settings)
+
+
+@pytest.fixture
+def client():
+    import app
+    return app.app.test_client()
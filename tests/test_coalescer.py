@@ -0,0 +1,93 @@
+import threading
+
+import openai
+
+from app import TranslationCoalescer
+
+CHAT = "/v1/chat/completions"
+
+
+def chat_requests(server):
+    with server.counts_lock:
+        return server.request_counts.get(CHAT, 0)
+
+
+def run_concurrently(calls):
+    """Runs each callable on its own thread; returns results or exceptions."""
+    results = [None] * len(calls)
+
+    def run(i):
+        try:
+            results[i] = calls[i]()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(calls))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    return results
+
+
+def test_concurrent_duplicates_share_one_request(mock_openai):
+    coalescer = TranslationCoalescer(window_ms=100, max_batch=16)
+    sentences = ["Take one tablet daily.", "Drink plenty of water."]
+    before = chat_requests(mock_openai)
+
+    results = run_concurrently(
+        [lambda: coalescer.translate_many(sentences, "Spanish")] * 5
+    )
+
+    expected = ["[Spanish] Take one tablet daily.", "[Spanish] Drink plenty of water."]
+    assert results == [expected] * 5
+    assert chat_requests(mock_openai) - before == 1
+    stats = coalescer.stats()
+    assert stats["batches"] == 1
+    assert stats["items"] == 2
+    assert stats["singleFlightHits"] == 8
+    assert coalescer.inflight == {}
+
+
+def test_duplicate_within_one_call_is_sent_once(mock_openai):
+    coalescer = TranslationCoalescer(window_ms=10, max_batch=16)
+    assert coalescer.translate_many(["Rest.", "Rest."], "French") == [
+        "[French] Rest.", "[French] Rest.",
+    ]
+    assert coalescer.stats()["items"] == 1
+
+
+def test_languages_are_batched_separately(mock_openai):
+    coalescer = TranslationCoalescer(window_ms=50, max_batch=16)
+    results = run_concurrently([
+        lambda: coalescer.translate_many(["Rest."], "Spanish"),
+        lambda: coalescer.translate_many(["Rest."], "German"),
+    ])
+    assert results == [["[Spanish] Rest."], ["[German] Rest."]]
+    assert coalescer.stats()["batches"] == 2
+
+
+def test_full_batch_is_sent_without_waiting(mock_openai):
+    coalescer = TranslationCoalescer(window_ms=60000, max_batch=2)
+    [result] = run_concurrently([lambda: coalescer.translate_many(["One.", "Two."], "Spanish")])
+    assert result == ["[Spanish] One.", "[Spanish] Two."]
+
+
+def test_failure_reaches_every_waiting_caller(mock_openai):
+    mock_openai.settings.failure_rate = 1.0
+    mock_openai.settings.failure_status = 400
+    coalescer = TranslationCoalescer(window_ms=100, max_batch=16)
+
+    results = run_concurrently(
+        [lambda: coalescer.translate_many(["Stop the medication."], "Spanish")] * 4
+        + [lambda: coalescer.translate_many(["Call us.", "Stop the medication."], "Spanish")]
+    )
+
+    assert all(isinstance(r, openai.BadRequestError) for r in results)
+    assert coalescer.stats()["batches"] == 1
+    assert coalescer.inflight == {}
+
+    mock_openai.settings.failure_rate = 0.0
+    assert coalescer.translate_many(["Stop the medication."], "Spanish") == [
+        "[Spanish] Stop the medication.",
+    ]
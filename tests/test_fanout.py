@@ -0,0 +1,118 @@
+import json
+import uuid
+
+import pytest
+
+import app
+import mock_openai as mock_module
+
+CHAT = "/v1/chat/completions"
+
+
+def chat_requests(server):
+    with server.counts_lock:
+        return server.request_counts.get(CHAT, 0)
+
+
+def fresh_text():
+    return f"Take the tablet with food. Reference {uuid.uuid4().hex}."
+
+
+def translate_many(client, languages, text=None, stream=False):
+    return client.post(
+        "/translate" + ("?stream=1" if stream else ""),
+        json={"text": text or fresh_text(), "targetLanguages": languages},
+    )
+
+
+def sse_events(response):
+    events = []
+    for block in response.get_data(as_text=True).strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.parametrize("languages", [
+    "Spanish", [], ["Spanish", ""], ["Spanish", 3],
+    ["L%d" % i for i in range(app.TRANSLATION_MAX_LANGUAGES + 1)],
+])
+def test_invalid_language_lists_are_400(client, languages):
+    assert translate_many(client, languages).status_code == 400
+
+
+def test_duplicates_are_translated_once(client):
+    response = translate_many(client, ["Spanish", " Spanish", "French"])
+    assert response.status_code == 200
+    assert sorted(response.json["translations"]) == ["French", "Spanish"]
+
+
+def test_short_text_is_packed_into_one_request(client, mock_openai):
+    before = chat_requests(mock_openai)
+    text = fresh_text()
+    response = translate_many(client, ["Spanish", "French", "German"], text)
+
+    assert chat_requests(mock_openai) - before == 1
+    translations = response.json["translations"]
+    assert translations["Spanish"]["translatedText"] == " ".join(
+        f"[Spanish] {sentence}" for sentence, _ in app.split_sentences(text)
+    )
+    assert all(result["packed"] for result in translations.values())
+
+
+def test_malformed_language_falls_back_alone(client, mock_openai, monkeypatch):
+    original = mock_module._chat_reply
+
+    def drop_french(payload):
+        reply = original(payload)
+        if "languages:" in payload["messages"][0]["content"]:
+            data = json.loads(reply)
+            data["French"] = data["French"][:-1]
+            reply = json.dumps(data)
+        return reply
+
+    monkeypatch.setattr(mock_module, "_chat_reply", drop_french)
+    translations = translate_many(client, ["Spanish", "French"]).json["translations"]
+
+    assert translations["Spanish"]["packed"] is True
+    assert "packed" not in translations["French"]
+    assert translations["French"]["translatedText"].startswith("[French] ")
+
+
+def test_one_failing_language_does_not_fail_the_others(client, monkeypatch):
+    real = app.translate_document
+
+    def fail_french(text, language):
+        if language == "French":
+            raise app.UpstreamBusyError("Server is busy, please retry shortly")
+        return real(text, language)
+
+    monkeypatch.setattr(app, "TRANSLATION_PACK_TOKENS", 0)
+    monkeypatch.setattr(app, "translate_document", fail_french)
+
+    response = translate_many(client, ["Spanish", "French"])
+    assert response.status_code == 200
+    assert response.json["translations"]["French"] == {
+        "error": "Server is busy, please retry shortly", "status": 503,
+    }
+    assert "translatedText" in response.json["translations"]["Spanish"]
+
+    events = sse_events(translate_many(client, ["Spanish", "French"], stream=True))
+    by_language = {data["language"]: (event, data) for event, data in events[:-1]}
+    assert by_language["French"][0] == "error"
+    assert by_language["French"][1]["status"] == 503
+    assert by_language["Spanish"][0] == "translation"
+    assert events[-1][0] == "done"
+    assert set(events[-1][1]["translations"]) == {"Spanish", "French"}
+
+
+def test_refused_packed_request_reports_every_language(client, mock_openai):
+    mock_openai.settings.failure_rate = 1.0
+    mock_openai.settings.failure_status = 429
+
+    response = translate_many(client, ["Spanish", "French"])
+
+    assert response.status_code == 429
+    for result in response.json["translations"].values():
+        assert result["status"] == 429
+        assert "error" in result
@@ -0,0 +1,98 @@
+import hashlib
+import io
+import os
+import time
+import uuid
+
+import app
+from app import JobQueue
+
+
+def audio_upload(audio=None):
+    return {"audio_data": (io.BytesIO(audio or os.urandom(64)), "recording.webm")}
+
+
+def wait_until_finished(get, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_is_accepted_then_done(client):
+    response = client.post("/jobs", data=audio_upload())
+    assert response.status_code == 202
+    job_id = response.json["jobId"]
+    assert response.headers["Location"] == f"/jobs/{job_id}"
+    assert response.json["deduplicated"] is False
+
+    job = wait_until_finished(lambda i: client.get(f"/jobs/{i}").json, job_id)
+    assert job["status"] == "done"
+    assert "chest pain" in job["transcript"]
+
+
+def test_duplicate_audio_returns_the_same_job(client):
+    audio = uuid.uuid4().bytes * 4
+    first = client.post("/jobs", data=audio_upload(audio)).json
+    second = client.post("/jobs", data=audio_upload(audio))
+    assert second.status_code == 202
+    assert second.json["jobId"] == first["jobId"]
+    assert second.json["deduplicated"] is True
+    wait_until_finished(lambda i: client.get(f"/jobs/{i}").json, first["jobId"])
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/jobs/does-not-exist").status_code == 404
+
+
+def test_byte_limit_answers_503(client, monkeypatch):
+    monkeypatch.setattr(app.job_queue, "max_queue_bytes", 10)
+    response = client.post("/jobs", data=audio_upload(os.urandom(64)))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_count_limit_answers_503(client, monkeypatch):
+    monkeypatch.setattr(app.job_queue, "max_queue", 0)
+    response = client.post("/jobs", data=audio_upload())
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_queues_sharing_a_store_see_each_others_jobs(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    accepting = JobQueue(workers=1, max_queue=10, max_queue_bytes=1 << 20, path=path)
+    other = JobQueue(workers=1, max_queue=10, max_queue_bytes=1 << 20, path=path)
+    audio = os.urandom(64)
+
+    job, _ = accepting.submit(audio, "recording.webm")
+    done = wait_until_finished(other.get, job["jobId"])
+    assert done["status"] == "done"
+
+    duplicate, deduplicated = other.submit(audio, "recording.webm")
+    assert deduplicated is True
+    assert duplicate["jobId"] == job["jobId"]
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+
+def test_jobs_of_a_stopped_process_are_failed_not_shared(tmp_path):
+    queue = JobQueue(workers=1, max_queue=10, max_queue_bytes=1 << 20,
+                     path=str(tmp_path / "jobs.sqlite3"))
+    audio = os.urandom(64)
+    with queue.lock:
+        db = queue._store()
+        with db:
+            db.execute(
+                "INSERT INTO jobs (id, audio_hash, status, submitted, owner) "
+                "VALUES ('orphan', ?, 'running', ?, '999999999:gone')",
+                (hashlib.sha256(audio).hexdigest(), time.time()),
+            )
+
+    assert queue.get("orphan")["status"] == "failed"
+    job, deduplicated = queue.submit(audio, "recording.webm")
+    assert deduplicated is False
+    assert job["jobId"] != "orphan"
+    wait_until_finished(queue.get, job["jobId"])
@@ -0,0 +1,78 @@
+import io
+import time
+
+import app
+
+
+def post_segment(client, seq, session_id=""):
+    return client.post("/upload/segments", data={
+        "seq": str(seq), "sessionId": session_id,
+        "audio_data": (io.BytesIO(b"segment %d" % seq), f"segment-{seq}.webm"),
+    })
+
+
+def wait_for_segments(session_id):
+    session = app.upload_sessions[session_id]
+    deadline = time.monotonic() + 10
+    while any(s["status"] == "pending" for s in session.statuses()):
+        assert time.monotonic() < deadline, "segments did not finish"
+        time.sleep(0.02)
+    return session.statuses()
+
+
+def test_segments_are_joined_in_order(client):
+    session_id = post_segment(client, 0).json["sessionId"]
+    assert post_segment(client, 1, session_id).status_code == 200
+    wait_for_segments(session_id)
+
+    report = post_segment(client, 2, session_id).json
+    assert len(report["transcripts"]) == 2
+
+    finished = client.post(f"/upload/segments/{session_id}/finish")
+    assert finished.status_code == 200
+    assert finished.json["complete"] is True
+    assert finished.json["transcript"].count("chest pain") == 3
+    assert session_id not in app.upload_sessions
+
+
+def test_duplicate_seq_is_409(client):
+    session_id = post_segment(client, 0).json["sessionId"]
+    response = post_segment(client, 0, session_id)
+    assert response.status_code == 409
+    wait_for_segments(session_id)
+    assert post_segment(client, 0, session_id).status_code == 409
+
+
+def test_failed_segment_is_reported_and_can_be_sent_again(client, mock_openai):
+    mock_openai.settings.failure_rate = 1.0
+    mock_openai.settings.failure_status = 400
+    session_id = post_segment(client, 0).json["sessionId"]
+    wait_for_segments(session_id)
+    mock_openai.settings.failure_rate = 0.0
+
+    report = post_segment(client, 2, session_id)
+    assert report.status_code == 200
+    assert report.json["failed"] == [0]
+    assert report.json["missing"] == [1]
+    assert report.json["segments"][0]["status"] == "failed"
+    assert report.json["transcripts"] == []
+
+    finished = client.post(f"/upload/segments/{session_id}/finish")
+    assert finished.status_code == 200
+    assert finished.json["complete"] is False
+    assert finished.json["failed"] == [0]
+    assert finished.json["missing"] == [1]
+    assert "chest pain" in finished.json["transcript"]
+    assert session_id in app.upload_sessions
+
+    assert post_segment(client, 0, session_id).status_code == 200
+    assert post_segment(client, 1, session_id).status_code == 200
+    finished = client.post(f"/upload/segments/{session_id}/finish")
+    assert finished.json["complete"] is True
+    assert finished.json["failed"] == [] and finished.json["missing"] == []
+    assert session_id not in app.upload_sessions
+
+
+def test_unknown_session_is_404(client):
+    assert post_segment(client, 1, "no-such-session").status_code == 404
+    assert client.post("/upload/segments/no-such-session/finish").status_code == 404
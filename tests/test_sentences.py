@@ -0,0 +1,36 @@
+import pytest
+
+from app import split_sentences
+
+
+def sentences(text):
+    return [sentence for sentence, _ in split_sentences(text)]
+
+
+def test_pairs_reassemble_original_text():
+    text = "Chest pain since Monday.  No fever!\n\nAny allergies?\nNone known."
+    pairs = split_sentences(text)
+    assert "".join(s + sep for s, sep in pairs) == text
+    assert sentences(text) == [
+        "Chest pain since Monday.", "No fever!", "Any allergies?", "None known.",
+    ]
+
+
+def test_title_abbreviations_do_not_end_sentences():
+    assert sentences("Dr. Patel saw her, e.g. on Monday. She is better.") == [
+        "Dr. Patel saw her, e.g. on Monday.", "She is better.",
+    ]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Any allergies? No. She denies them.", ["Any allergies?", "No.", "She denies them."]),
+    ("Use form No. 4 today.", ["Use form No. 4 today."]),
+    ("Take 5 mg. Then rest.", ["Take 5 mg.", "Then rest."]),
+    ("Give 2 ml. Repeat in an hour.", ["Give 2 ml.", "Repeat in an hour."]),
+])
+def test_number_and_unit_periods(text, expected):
+    assert sentences(text) == expected
+
+
+def test_newline_always_breaks_after_abbreviation():
+    assert sentences("Seen by Dr.\nNext patient.") == ["Seen by Dr.", "Next patient."]
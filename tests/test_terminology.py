@@ -0,0 +1,67 @@
+import pytest
+
+import app
+from app import TerminologyIndex
+
+
+@pytest.fixture
+def index():
+    return TerminologyIndex(
+        terms=["metformin", "lisinopril", "hypertension", "atrial fibrillation", "afib"],
+        corrections={"high per tension": "hypertension", "metaformin": "metformin"},
+        ignored=["tension"],
+        possible={"a fib": "atrial fibrillation"},
+    )
+
+
+def test_correct_applies_known_mishearings(index):
+    text, count = index.correct("History of high per tension. Metaformin daily.")
+    assert text == "History of hypertension. Metformin daily."
+    assert count == 2
+
+
+def test_correct_matches_whole_words_only(index):
+    assert index.correct("She is metaformingly fine.") == ("She is metaformingly fine.", 0)
+
+
+def test_possible_mishearing_is_flagged_not_rewritten(index):
+    text, count = index.correct("He told a fib.")
+    assert (text, count) == ("He told a fib.", 0)
+    assert index.near_misses(text) == [(8, 13, "a fib", ["atrial fibrillation"])]
+
+
+def test_near_misses_flag_words_close_to_lexicon_terms(index):
+    text = "Takes lisinoprel for hypertension."
+    assert index.near_misses(text) == [(6, 16, "lisinoprel", ["lisinopril"])]
+
+
+def test_near_misses_trust_lexicon_and_ignored_words(index):
+    assert index.near_misses("Afib with tension headaches, on metformin.") == []
+
+
+def test_shipped_lexicon_leaves_everyday_phrases_alone():
+    index = TerminologyIndex.load(app.TERMINOLOGY_LEXICON_PATH)
+    for phrase in ("He told a fib.", "They met forming a plan.", "Lice and April visits."):
+        assert index.correct(phrase) == (phrase, 0)
+        assert index.near_misses(phrase)
+
+
+def test_near_misses_know_singulars_of_lexicon_terms():
+    index = TerminologyIndex(terms=["milligrams", "tablets"], corrections={}, ignored=[])
+    assert index.near_misses("One milligram tablet.") == []
+
+
+def test_shipped_lexicon_leaves_common_clinical_words_alone():
+    index = TerminologyIndex.load(app.TERMINOLOGY_LEXICON_PATH)
+    text = ("Arthritic knee, no infection at the injection site. "
+            "Hearing fine, 5 milligram infusion for hydration.")
+    assert index.near_misses(text) == []
+
+
+def test_refinement_sends_possible_mishearings_to_the_model(monkeypatch):
+    monkeypatch.setattr(app, "REFINEMENT_MODE", "auto")
+    before = app.refinement_stats()
+    assert app.refine_transcript("He told a fib. Nothing else.") == "He told a fib. Nothing else."
+    after = app.refinement_stats()
+    assert after["partial"] == before["partial"] + 1
+    assert after["skipped"] == before["skipped"]
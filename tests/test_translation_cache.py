@@ -0,0 +1,51 @@
+import os
+import stat
+import time
+
+from app import TranslationCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = TranslationCache(max_entries=2, path="")
+    cache.put_many([("One.", "Uno."), ("Two.", "Dos.")], "Spanish")
+    assert cache.get_many(["One."], "Spanish") == {0: "Uno."}
+
+    cache.put_many([("Three.", "Tres.")], "Spanish")
+
+    assert cache.get_many(["One.", "Two.", "Three."], "Spanish") == {0: "Uno.", 2: "Tres."}
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+
+
+def test_keys_normalize_whitespace_and_language():
+    cache = TranslationCache(max_entries=4, path="")
+    cache.put_many([("Take  one\ttablet.", "Tome una tableta.")], "Spanish")
+    assert cache.get_many(["Take one tablet."], " spanish ") == {0: "Tome una tableta."}
+    assert cache.get_many(["Take one tablet."], "French") == {}
+
+
+def test_disk_tier_is_private_and_pruned(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TranslationCache(max_entries=1, path=path, max_rows=2)
+    cache.PRUNE_EVERY = 1
+    for i in range(4):
+        cache.put_many([(f"Sentence {i}.", f"Frase {i}.")], "Spanish")
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    fresh = TranslationCache(max_entries=4, path=path)
+    found = fresh.get_many([f"Sentence {i}." for i in range(4)], "Spanish")
+    assert len(found) == 2
+    assert cache.stats()["diskPruned"] >= 2
+
+
+def test_expired_disk_rows_are_ignored(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite3")
+    TranslationCache(max_entries=1, path=path).put_many([("Hello.", "Hola.")], "Spanish")
+    assert TranslationCache(max_entries=1, path=path, ttl=3600).get_many(
+        ["Hello."], "Spanish") == {0: "Hola."}
+
+    later = time.time() + 7200
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert TranslationCache(max_entries=1, path=path, ttl=3600).get_many(
+        ["Hello."], "Spanish") == {}
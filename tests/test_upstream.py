@@ -0,0 +1,92 @@
+import threading
+import time
+import uuid
+
+import openai
+import pytest
+
+import app
+from app import UpstreamBusyError, UpstreamClient
+
+CHAT = "/v1/chat/completions"
+
+
+@pytest.fixture
+def small_upstream(monkeypatch):
+    """A one-slot upstream client with no queue and near-instant backoff."""
+    monkeypatch.setattr(app, "OPENAI_BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(app, "OPENAI_BACKOFF_MAX", 0.01)
+    client = UpstreamClient(concurrency=1, queue_limit=0)
+    monkeypatch.setattr(app, "upstream", client)
+    return client
+
+
+def chat_requests(server):
+    with server.counts_lock:
+        return server.request_counts.get(CHAT, 0)
+
+
+def translate(client, text=None):
+    return client.post("/translate", json={
+        "text": text or f"Check reference {uuid.uuid4().hex}.", "targetLanguage": "Spanish",
+    })
+
+
+def hello(upstream_client):
+    return upstream_client.chat(model="gpt-3.5-turbo",
+                                messages=[{"role": "user", "content": "Hello"}])
+
+
+def test_call_beyond_admission_limit_is_refused_at_once(mock_openai, small_upstream, client):
+    mock_openai.settings.latency_ms = 300
+    slow = threading.Thread(target=hello, args=(small_upstream,))
+    slow.start()
+    time.sleep(0.1)
+    try:
+        started = time.monotonic()
+        with pytest.raises(UpstreamBusyError):
+            hello(small_upstream)
+        response = translate(client)
+        assert time.monotonic() - started < 0.2
+    finally:
+        slow.join()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert small_upstream.stats()["rejected"] == 2
+
+
+def test_rate_limit_is_retried_then_answers_429(mock_openai, small_upstream, client):
+    mock_openai.settings.failure_rate = 1.0
+    mock_openai.settings.failure_status = 429
+    before = chat_requests(mock_openai)
+
+    response = translate(client)
+
+    assert response.status_code == 429
+    assert chat_requests(mock_openai) - before == app.OPENAI_MAX_RETRIES + 1
+    stats = small_upstream.stats()
+    assert stats["retries"] == app.OPENAI_MAX_RETRIES
+    assert stats["errors"] == 1
+
+
+def test_timeout_answers_504(mock_openai, small_upstream, client, monkeypatch):
+    monkeypatch.setattr(app, "OPENAI_TIMEOUT", 0.05)
+    mock_openai.settings.latency_ms = 500
+
+    response = translate(client)
+
+    assert response.status_code == 504
+    assert small_upstream.stats()["timeouts"] == app.OPENAI_MAX_RETRIES + 1
+
+
+def test_client_errors_are_not_retried(mock_openai, small_upstream):
+    mock_openai.settings.failure_rate = 1.0
+    mock_openai.settings.failure_status = 400
+    before = chat_requests(mock_openai)
+
+    with pytest.raises(openai.BadRequestError):
+        hello(small_upstream)
+
+    assert chat_requests(mock_openai) - before == 1
+    assert small_upstream.stats()["retries"] == 0